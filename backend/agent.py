@@ -1,61 +1,263 @@
 import asyncio
-from dedalus_labs import AsyncDedalus, DedalusRunner
+import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from cache import ResponseCache
+from metrics import span, stage_latency
+
 load_dotenv()
 
-client = AsyncDedalus()
-runner = DedalusRunner(client)
+# The SDK is slow to import, so the client is created on first use
+# (or by the startup warm-up) instead of at import
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            from dedalus_labs import AsyncDedalus, DedalusRunner
+            _runner = DedalusRunner(AsyncDedalus())
+    return _runner
+
 
 MODEL = "anthropic/claude-opus-4-6"
 
+# --- Analysis response cache ---
+# Identical model + prompt + drift summary returns the stored answer instead
+# of another paid round-trip. AGENT_CACHE_PERSIST=1 keeps answers on disk.
+AGENT_CACHE_TTL = float(os.getenv("AGENT_CACHE_TTL", "3600"))
+AGENT_CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "128"))
+AGENT_CACHE_DB = os.path.join(os.path.dirname(__file__), "agent_cache.db")
+
+analysis_cache = ResponseCache(
+    maxsize=AGENT_CACHE_SIZE,
+    ttl=AGENT_CACHE_TTL,
+    db_path=AGENT_CACHE_DB if os.getenv("AGENT_CACHE_PERSIST") == "1" else None,
+)
+
+# --- Per-category analysis (POST /api/analyze) ---
+# Categories are analyzed concurrently, then one short call ranks the actions
+AGENT_CONCURRENCY = int(os.getenv("AGENT_CONCURRENCY", "3"))
+AGENT_CATEGORY_TIMEOUT = float(os.getenv("AGENT_CATEGORY_TIMEOUT", "45"))    # seconds
+AGENT_SYNTHESIS_TIMEOUT = float(os.getenv("AGENT_SYNTHESIS_TIMEOUT", "45"))  # seconds
+CATEGORY_ITEMS = 10   # items per category sent to the model
+
+_upstream_slots = asyncio.Semaphore(AGENT_CONCURRENCY)
+
 SYSTEM = """You are PayDrift, an elite financial AI agent. Sharp, direct, data-driven. You speak like a trusted CFO advisor. No fluff. Every sentence must reference specific numbers from the data. Rank recommendations by (savings × ease)."""
 
-ANALYZE = """Given this drift data, provide:
+CATEGORY = """Analyze ONLY this spend category. In 3-4 sentences: what is drifting, the likely root cause, and the 2-3 most valuable actions with estimated savings ($/mo) and effort (Easy/Medium/Hard). Reference the numbers."""
 
-## 🔍 Analysis
-2-3 sentences. Be specific with numbers. Identify root causes.
+SYNTHESIZE = """Below are analyses of each spend category (raw numbers are given for any category that couldn't be analyzed). Combine them into:
 
 ## 🎯 Top Recommendations
-5 actions ranked by impact. Each: **Action** (1 sentence), **Saves** ($/mo), **Effort** (Easy/Medium/Hard), **Timeline** (Immediate/2 weeks/1 month)
+5 actions ranked by impact across all categories. Each: **Action** (1 sentence), **Saves** ($/mo), **Effort** (Easy/Medium/Hard), **Timeline** (Immediate/2 weeks/1 month)
 
 ## ⚡ Quick Win
 Single easiest thing to do TODAY.
 
 ## 📊 Risk Alert
-Most dangerous trend if unchecked 6 months. Project the cost."""
+Most dangerous trend if unchecked 6 months. Project the cost.
+
+Be brief: no preamble, no repetition of the category analyses."""
+
+
+def format_totals(drift_data: dict) -> list[str]:
+    return ["COMPANY SPEND DRIFT REPORT",
+            f"Total: ${drift_data['total_monthly_drift']:,.0f}/mo (${drift_data['annualized_drift']:,.0f}/yr)", ""]
+
+
+def format_category(cat: dict, top: int = 5) -> list[str]:
+    lines = [f"{cat['label'].upper()} — {cat['total_drift']:+,.0f}/mo ({cat['drift_pct']:+.1f}%)"]
+    for item in cat.get("items", [])[:top]:
+        lines.append(f"  {item['item']}: {item['drift']:+,.0f}/mo ({item['drift_pct']:+.1f}%)")
+    return lines
 
 
 async def format_drift_for_ai(drift_data: dict) -> str:
-    lines = ["COMPANY SPEND DRIFT REPORT",
-             f"Total: ${drift_data['total_monthly_drift']:,.0f}/mo (${drift_data['annualized_drift']:,.0f}/yr)", ""]
-    for cat in drift_data.get("categories", []):
-        lines.append(f"{cat['label'].upper()} — {cat['total_drift']:+,.0f}/mo ({cat['drift_pct']:+.1f}%)")
-        for item in cat.get("items", [])[:5]:
-            lines.append(f"  {item['item']}: {item['drift']:+,.0f}/mo ({item['drift_pct']:+.1f}%)")
-        lines.append("")
-    return "\n".join(lines)
-
-
-async def analyze_drift(summary: str) -> str:
-    response = await runner.run(
-        input=f"{SYSTEM}\n\n{ANALYZE}\n\nHere is the drift data:\n\n{summary}",
-        model=MODEL,
-    )
-    return response.final_output
+    with span("agent.format_drift_for_ai"):
+        lines = format_totals(drift_data)
+        for cat in drift_data.get("categories", []):
+            lines.extend(format_category(cat))
+            lines.append("")
+        return "\n".join(lines)
+
+
+def chat_prefix(summary: str) -> str:
+    """System prompt + drift data. Unchanged across turns; main caches it per dataset version."""
+    return f"{SYSTEM}\n\nCurrent company drift data:\n{summary}"
 
 
-async def chat_with_agent(message: str, history: list, summary: str) -> str:
-    # Build context from history
-    context_parts = [f"{SYSTEM}\n\nCurrent company drift data:\n{summary}\n\nConversation so far:"]
+def chat_prompt(message: str, history: list, prefix: str, earlier: str = "") -> str:
+    # `prefix` is chat_prefix(); `earlier` summarizes turns no longer sent verbatim
+    context_parts = [prefix]
+    if earlier:
+        context_parts.append(f"Summary of earlier conversation:\n{earlier}")
+    context_parts[-1] += "\n\nConversation so far:"
     for h in history:
         role = "User" if h.get("role") in ("user",) else "Assistant"
         context_parts.append(f"{role}: {h['content']}")
     context_parts.append(f"User: {message}")
     context_parts.append("Answer based on the data. Be specific with numbers.")
+    return "\n\n".join(context_parts)
+
+
+async def stream_tokens(prompt: str):
+    """Yield text deltas from the runner as the model generates them."""
+    start = time.perf_counter()
+    first_token = True
+    stream = get_runner().run(input=prompt, model=MODEL, stream=True)
+    try:
+        async for chunk in stream:
+            choices = getattr(chunk, "choices", None)
+            if not choices:
+                continue
+            content = getattr(choices[0].delta, "content", None)
+            if content:
+                if first_token:
+                    stage_latency.observe(time.perf_counter() - start, "agent.runner.first_token")
+                    first_token = False
+                yield content
+    finally:
+        stage_latency.observe(time.perf_counter() - start, "agent.runner.stream")
+        # Client went away (or we finished): stop reading from upstream
+        await stream.aclose()
+
+
+async def _run_limited(prompt: str, timeout: float, stage: str) -> str:
+    """
+    One upstream call under the concurrency limit, cancelled after `timeout`
+    seconds. The time spent waiting for a slot counts toward the timeout,
+    so a busy server can't stretch a category past its deadline.
+    """
+    async def call():
+        async with _upstream_slots:
+            with span(stage):
+                return await get_runner().run(input=prompt, model=MODEL)
+
+    response = await asyncio.wait_for(call(), timeout)
+    return response.final_output
+
+
+async def analyze_category(cat: dict, timeout: float = AGENT_CATEGORY_TIMEOUT) -> str:
+    data = "\n".join(format_category(cat, CATEGORY_ITEMS))
+    prompt = f"{SYSTEM}\n\n{CATEGORY}\n\n{data}"
+    key = ResponseCache.make_key(MODEL, f"{SYSTEM}\n\n{CATEGORY}", data)
+    return await analysis_cache.get_or_call(
+        key, lambda: _run_limited(prompt, timeout, "agent.analyze_category"),
+    )
+
 
-    response = await runner.run(
-        input="\n\n".join(context_parts),
-        model=MODEL,
+async def synthesize(drift_data: dict, findings: list[str],
+                     timeout: float = AGENT_SYNTHESIS_TIMEOUT) -> str:
+    data = "\n".join(format_totals(drift_data) + findings)
+    prompt = f"{SYSTEM}\n\n{SYNTHESIZE}\n\n{data}"
+    key = ResponseCache.make_key(MODEL, f"{SYSTEM}\n\n{SYNTHESIZE}", data)
+    return await analysis_cache.get_or_call(
+        key, lambda: _run_limited(prompt, timeout, "agent.synthesize"),
     )
-    return response.final_output
\ No newline at end of file
+
+
+async def _timed_category(cat: dict) -> dict:
+    """analyze_category() with its status and timing; never raises."""
+    start = time.perf_counter()
+    try:
+        text, status = await analyze_category(cat), "ok"
+    except asyncio.TimeoutError:
+        text, status = None, "timeout"
+    except Exception as e:
+        print(f"Category analysis failed for {cat['category']}: {e!r}")
+        text, status = None, "error"
+    return {
+        "category": cat["category"],
+        "label": cat["label"],
+        "status": status,
+        "analysis": text,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000),
+    }
+
+
+def _category_section(result: dict) -> str:
+    body = result["analysis"] or f"_Analysis unavailable ({result['status']})._"
+    return f"### {result['label']}\n{body}"
+
+
+async def _recommendations(drift_data: dict, categories: list[dict], results: list[dict]) -> str | None:
+    """
+    The synthesis call over the category results (raw numbers for any that
+    failed), or None if it failed too. Raises RuntimeError if every call failed.
+    """
+    findings = []
+    for cat, result in zip(categories, results):
+        if result["analysis"] is not None:
+            findings += [f"{cat['label'].upper()} ANALYSIS:", result["analysis"], ""]
+        else:
+            findings += format_category(cat, CATEGORY_ITEMS) + [""]
+
+    try:
+        recommendations = await synthesize(drift_data, findings)
+    except Exception as e:
+        if not isinstance(e, asyncio.TimeoutError):
+            print(f"Synthesis failed: {e!r}")
+        recommendations = None
+
+    if recommendations is None and all(r["analysis"] is None for r in results):
+        raise RuntimeError("All analysis calls failed or timed out")
+    return recommendations
+
+
+async def analyze_drift_parallel(drift_data: dict) -> dict:
+    """
+    Fan out one analysis call per category, then fan in with a short
+    synthesis call that ranks the recommendations. A category that times
+    out or fails is reported as such and its raw numbers go to the
+    synthesis instead, so the answer is partial rather than an error.
+    Raises RuntimeError only if every call failed.
+    """
+    categories = drift_data.get("categories", [])
+    results = await asyncio.gather(*(_timed_category(cat) for cat in categories))
+    recommendations = await _recommendations(drift_data, categories, results)
+
+    sections = ["## 🔍 Analysis"] + [_category_section(result) for result in results]
+    if recommendations is not None:
+        sections.append(recommendations)
+
+    return {
+        "analysis": "\n\n".join(sections),
+        "categories": results,
+        "recommendations": recommendations,
+        "partial": recommendations is None or any(r["status"] != "ok" for r in results),
+    }
+
+
+async def stream_analysis(drift_data: dict):
+    """
+    Streaming analyze_drift_parallel(): the same calls and the same text,
+    yielded section by section (in category order) as each is ready, then
+    the recommendations. Category calls still run concurrently; if the
+    client goes away, the ones not yet awaited are cancelled.
+    """
+    categories = drift_data.get("categories", [])
+    tasks = [asyncio.ensure_future(_timed_category(cat)) for cat in categories]
+    try:
+        yield "## 🔍 Analysis"
+        results = []
+        for task in tasks:
+            results.append(await task)
+            yield "\n\n" + _category_section(results[-1])
+        recommendations = await _recommendations(drift_data, categories, results)
+        if recommendations is not None:
+            yield "\n\n" + recommendations
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def complete(prompt: str) -> str:
+    with span("agent.runner.run"):
+        response = await get_runner().run(input=prompt, model=MODEL)
+    return response.final_output
@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+from drift import round2, to_records
+from metrics import span
+
+# --- Thresholds ---
+# A signal counts as a reason once its robust z-score (vs all employees)
+# reaches ANOMALY_Z; band z-scores are plain z-scores within the peer group.
+ANOMALY_Z = 3.0
+BAND_Z = 2.0
+MIN_PEERS = 3            # band z-scores need at least this many peers
+OVERTIME_HEAVY = 0.10    # overtime above 10% of base counts as a heavy month
+RECENT_MONTHS = 3        # window for the recent overtime ratio
+
+SIGNALS = ["score", "band_z", "salary_slope_pct", "max_jump_pct", "overtime_pct"]
+
+
+def employee_matrix(values: np.ndarray, cell: np.ndarray, shape) -> np.ndarray:
+    """
+    employee x month sums of values (several rows in a month, e.g. a
+    correction line, add up), NaN where an employee has no value that month.
+    """
+    values = np.asarray(values, dtype="float64")
+    keep = ~np.isnan(values)
+    size = shape[0] * shape[1]
+    sums = np.bincount(cell[keep], values[keep], minlength=size)
+    seen = np.bincount(cell[keep], minlength=size) > 0
+    return np.where(seen, sums, np.nan).reshape(shape)
+
+
+def robust_z(values: np.ndarray) -> np.ndarray:
+    """
+    Modified z-score (x - median) / scale, with scale = 1.4826 * MAD. When
+    most employees share one value (e.g. no raise at all) the MAD collapses,
+    so the scale never drops below 1.2533 * mean absolute deviation.
+    """
+    median = np.nanmedian(values)
+    deviation = np.abs(values - median)
+    scale = max(np.nanmedian(deviation) * 1.4826, np.nanmean(deviation) * 1.2533)
+    if not np.isfinite(scale) or scale == 0:
+        return np.zeros_like(values)
+    return np.nan_to_num((values - median) / scale)
+
+
+@span("anomalies.employee_signals")
+def employee_signals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per employee with the salary creep and overtime signals, all
+    computed at once on the employee x month matrices (no per-employee loop):
+
+      salary_slope_pct  least-squares trend of base salary, % of mean per year
+      max_jump_pct      largest month-over-month base salary increase (%)
+      band_z            latest base salary vs peers in the same band and type
+      overtime_pct      overtime as % of base over the last RECENT_MONTHS months
+      heavy_ot_pct      % of months with overtime above OVERTIME_HEAVY of base
+      score             largest of the signals' z-scores
+    """
+    employees = df["employee_id"].astype("category")
+    emp_codes = employees.cat.codes.to_numpy().astype(np.int64)
+    months = df["month"]
+    if not isinstance(months.dtype, pd.PeriodDtype):
+        months = pd.to_datetime(months).dt.to_period("M")
+    ordinals = months.array.asi8
+    first = ordinals.min()
+    month_idx = ordinals - first
+    n_emp, n_months = len(employees.cat.categories), int(month_idx.max()) + 1
+    shape = (n_emp, n_months)
+    cell = emp_codes * n_months + month_idx
+
+    base_col = df["base_salary"].to_numpy(dtype="float64")
+    base = employee_matrix(base_col, cell, shape)
+    overtime = employee_matrix(df["overtime"], cell, shape)
+    observed = ~np.isnan(base)
+
+    # Latest row per employee: the last one (in file order) of its latest
+    # month with a base salary, else of its latest month at all
+    n_rows = len(df)
+    row_key = month_idx * n_rows + np.arange(n_rows)
+    latest_key = np.full(n_emp, -1, dtype=np.int64)
+    np.maximum.at(latest_key, emp_codes, np.where(np.isnan(base_col), -1, row_key))
+    any_key = np.full(n_emp, -1, dtype=np.int64)
+    np.maximum.at(any_key, emp_codes, row_key)
+    latest_key = np.where(latest_key >= 0, latest_key, any_key)
+    latest_row, last_idx = latest_key % n_rows, latest_key // n_rows
+    rows = np.arange(n_emp)
+    latest_base = base[rows, last_idx]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Least-squares slope of base salary over month index
+        x = np.where(observed, np.arange(n_months, dtype="float64"), np.nan)
+        n = observed.sum(axis=1)
+        sx, sy = np.nansum(x, axis=1), np.nansum(base, axis=1)
+        sxx, sxy = np.nansum(x * x, axis=1), np.nansum(x * base, axis=1)
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        slope_pct = np.nan_to_num(slope / (sy / n) * 12 * 100)
+
+        # Month-over-month jumps (consecutive observed months only)
+        jumps = np.diff(base, axis=1) / base[:, :-1] * 100
+        jumps = np.where(np.isnan(jumps), -np.inf, jumps)
+        jump_at = np.argmax(jumps, axis=1) if n_months > 1 else np.zeros(n_emp, dtype=int)
+        max_jump = jumps[rows, jump_at] if n_months > 1 else np.zeros(n_emp)
+        max_jump = np.where(np.isfinite(max_jump), max_jump, 0.0)
+
+        # Overtime: recent ratio and how often it is heavy
+        recent = slice(max(0, n_months - RECENT_MONTHS), n_months)
+        ot_pct = np.nan_to_num(np.nansum(overtime[:, recent], axis=1) / np.nansum(base[:, recent], axis=1)) * 100
+        heavy_pct = np.nan_to_num(((overtime / base) > OVERTIME_HEAVY).sum(axis=1) / n) * 100
+
+    # Band z-score of the latest base salary within (band, type) peer groups
+    latest = df.iloc[latest_row]
+    peer_key = latest["band"].astype(str).to_numpy() + "|" + latest["type"].astype(str).to_numpy()
+    peer_codes, _ = pd.factorize(peer_key)
+    peers = np.bincount(peer_codes)
+    band_mean = np.bincount(peer_codes, latest_base) / peers
+    band_var = np.bincount(peer_codes, latest_base ** 2) / peers - band_mean ** 2
+    band_std = np.sqrt(np.maximum(band_var, 0))[peer_codes]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        band_z = (latest_base - band_mean[peer_codes]) / band_std
+    band_z = np.where((peers[peer_codes] >= MIN_PEERS) & (band_std > 0), band_z, 0.0)
+
+    z_slope, z_jump, z_ot = robust_z(slope_pct), robust_z(max_jump), robust_z(ot_pct)
+    score = np.maximum.reduce([band_z, z_slope, z_jump, z_ot])
+
+    month_labels = pd.PeriodIndex.from_ordinals(np.arange(first, first + n_months), freq="M")
+    return pd.DataFrame({
+        "employee_id": employees.cat.categories.astype(str),
+        "name": latest["name"].astype(str).to_numpy(),
+        "department": latest["department"].astype(str).to_numpy(),
+        "role": latest["role"].astype(str).to_numpy(),
+        "band": latest["band"].astype(str).to_numpy(),
+        "type": latest["type"].astype(str).to_numpy(),
+        "latest_month": month_labels[last_idx].strftime("%Y-%m"),
+        "latest_base": latest_base,
+        "band_mean": band_mean[peer_codes],
+        "band_z": band_z,
+        "salary_slope_pct": slope_pct,
+        "max_jump_pct": max_jump,
+        "max_jump_month": month_labels[np.minimum(jump_at + 1, n_months - 1)].strftime("%Y-%m"),
+        "overtime_pct": ot_pct,
+        "heavy_ot_pct": heavy_pct,
+        "z_slope": z_slope,
+        "z_jump": z_jump,
+        "z_overtime": z_ot,
+        "score": score,
+    })
+
+
+def top_offenders(signals: pd.DataFrame, top_k: int = 20, signal: str = "score") -> list[dict]:
+    """The top_k employees by `signal` (one of SIGNALS), with the reasons they stand out."""
+    values = signals[signal].to_numpy()
+    k = min(top_k, len(values))
+    if k <= 0:
+        return []
+    top = np.argpartition(-values, k - 1)[:k]
+    top = top[np.argsort(-values[top], kind="stable")]
+    rows = signals.iloc[top]
+
+    reasons = [[] for _ in range(k)]
+    checks = [
+        (rows["band_z"] >= BAND_Z, "out_of_band"),
+        (rows["z_slope"] >= ANOMALY_Z, "salary_creep"),
+        (rows["z_jump"] >= ANOMALY_Z, "raise_jump"),
+        (rows["z_overtime"] >= ANOMALY_Z, "chronic_overtime"),
+    ]
+    for mask, reason in checks:
+        for i in np.flatnonzero(mask.to_numpy()):
+            reasons[i].append(reason)
+    contractor = (rows["type"] == "Contractor").to_numpy()
+    for i in np.flatnonzero(contractor & (rows["z_jump"] >= ANOMALY_Z).to_numpy()):
+        reasons[i].append("contractor_rate_bump")
+
+    return to_records({
+        "employee_id": rows["employee_id"].to_numpy(dtype=object),
+        "name": rows["name"].to_numpy(dtype=object),
+        "department": rows["department"].to_numpy(dtype=object),
+        "role": rows["role"].to_numpy(dtype=object),
+        "band": rows["band"].to_numpy(dtype=object),
+        "type": rows["type"].to_numpy(dtype=object),
+        "latest_month": rows["latest_month"].to_numpy(dtype=object),
+        "latest_base": round2(rows["latest_base"]),
+        "band_mean": round2(rows["band_mean"]),
+        "band_z": round2(rows["band_z"]),
+        "salary_slope_pct": round2(rows["salary_slope_pct"]),
+        "max_jump_pct": round2(rows["max_jump_pct"]),
+        "max_jump_month": rows["max_jump_month"].to_numpy(dtype=object),
+        "overtime_pct": round2(rows["overtime_pct"]),
+        "heavy_ot_pct": round2(rows["heavy_ot_pct"]),
+        "score": round2(rows["score"]),
+        "reasons": reasons,
+    })
@@ -1,18 +1,15 @@
 from datetime import datetime, timedelta, timezone
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from dotenv import load_dotenv
+from collections import OrderedDict
+from functools import lru_cache
 import os
-
-# passlib 1.7.4 tries to read bcrypt.__about__.__version__ which was removed in bcrypt 4.x
-import bcrypt as _bcrypt
-if not hasattr(_bcrypt, "__about__"):
-    _bcrypt.__about__ = type("_about", (), {"__version__": _bcrypt.__version__})()
-
-from passlib.context import CryptContext
+import threading
+import time
 
 from database import get_user_by_email
+from workers import WorkerPool
 
 load_dotenv()
 
@@ -20,23 +17,99 @@ load_dotenv()
 SECRET_KEY = os.getenv("JWT_SECRET", "paydrift-hackathon-secret-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+AUTH_HASH_QUEUE_LIMIT = int(os.getenv("AUTH_HASH_QUEUE_LIMIT", "64"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
 
 # --- Password hashing ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib/bcrypt and jose are imported on first use (or by the startup
+# warm-up) rather than at import, to keep cold starts short
+@lru_cache(maxsize=1)
+def pwd_context():
+    # passlib 1.7.4 tries to read bcrypt.__about__.__version__ which was removed in bcrypt 4.x
+    import bcrypt as _bcrypt
+    if not hasattr(_bcrypt, "__about__"):
+        _bcrypt.__about__ = type("_about", (), {"__version__": _bcrypt.__version__})()
+
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def warm_up():
+    """Import the hashing and JWT libraries ahead of the first login."""
+    pwd_context()
+    import jose.jwt  # noqa: F401
 
 # --- OAuth2 scheme (reads Bearer token from Authorization header) ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
 
+# bcrypt is deliberately slow (~100-300 ms of CPU per call), so it runs on
+# its own small thread pool: a login burst queues there (429 past the limit)
+# instead of stalling the event loop or the pandas workers
+hash_pool = WorkerPool("thread", AUTH_HASH_WORKERS, AUTH_HASH_QUEUE_LIMIT)
+
+
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return pwd_context().verify(plain, hashed)
+
+
+async def ahash_password(password: str) -> str:
+    return await hash_pool.run(hash_password, password)
+
+
+async def averify_password(plain: str, hashed: str) -> bool:
+    return await hash_pool.run(verify_password, plain, hashed)
+
+
+# --- Verified tokens (token -> (expires_at, email)) ---
+# A token that decoded fine stays valid until its exp, so it isn't re-decoded
+_token_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+_token_lock = threading.Lock()
+
+
+def decode_token(token: str) -> str | None:
+    """Email (JWT subject) of a valid token, or None. Cached until the token expires."""
+    now = time.time()
+    with _token_lock:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            if cached[0] > now:
+                _token_cache.move_to_end(token)
+                return cached[1]
+            del _token_cache[token]
+
+    from jose import JWTError, jwt
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    email = payload.get("sub")
+    if email is None:
+        return None
+
+    with _token_lock:
+        _token_cache[token] = (float(payload.get("exp", now)), email)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return email
+
+
+def bearer_subject(headers: list[tuple[bytes, bytes]]) -> str | None:
+    """Email of a valid bearer token in raw ASGI headers, or None (for middleware)."""
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return decode_token(token) if scheme.lower() == "bearer" and token else None
+    return None
 
 
 def create_access_token(data: dict) -> str:
+    from jose import jwt
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
@@ -50,12 +123,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
         detail="Invalid or expired token",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str | None = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
+    email = decode_token(token)
+    if email is None:
         raise credentials_exception
 
     user = await get_user_by_email(email)
@@ -0,0 +1,88 @@
+"""
+Benchmark: /api/me latency with the old per-request SQLite connection vs
+the pooled connection + user cache in database.py.
+
+    python bench_auth.py [requests] [concurrency]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+# Throwaway user database and workspaces, so runs leave nothing behind
+_scratch = tempfile.TemporaryDirectory(prefix="paydrift-bench-")
+os.environ["DB_PATH"] = os.path.join(_scratch.name, "paydrift.db")
+os.environ["WORKSPACE_DIR"] = os.path.join(_scratch.name, "workspaces")
+
+import aiosqlite
+import httpx
+
+import database
+import main
+
+
+# --- Previous implementation: a fresh connection for every lookup ---
+async def get_user_by_email_unpooled(email: str) -> dict | None:
+    async with aiosqlite.connect(database.DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT email, name, hashed_password FROM users WHERE email = ?",
+            (email,),
+        )
+        row = await cursor.fetchone()
+        if row is None:
+            return None
+        return {"email": row["email"], "name": row["name"], "hashed_password": row["hashed_password"]}
+
+
+async def measure(client, headers, n, concurrency, warmup=200) -> dict:
+    for _ in range(warmup):
+        await client.get("/api/me", headers=headers)
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            r = await client.get("/api/me", headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert r.status_code == 200, r.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": round(n / elapsed),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+    }
+
+
+async def run(n=2000, concurrency=50):
+    await main.startup()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        email = f"bench-{uuid.uuid4().hex}@example.com"
+        r = await client.post("/api/register", json={"email": email, "name": "Bench", "password": "bench"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        pooled = await measure(client, headers, n, concurrency)
+
+        original = main.get_current_user.__globals__["get_user_by_email"]
+        main.get_current_user.__globals__["get_user_by_email"] = get_user_by_email_unpooled
+        try:
+            unpooled = await measure(client, headers, n, concurrency)
+        finally:
+            main.get_current_user.__globals__["get_user_by_email"] = original
+
+    await main.shutdown()
+    print({"before (connect per request)": unpooled, "after (pool + user cache)": pooled})
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    asyncio.run(run(*args))
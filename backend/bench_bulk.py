@@ -0,0 +1,64 @@
+"""
+Bulk ingest benchmark: one zip of monthly CSVs per dataset (synthetic,
+see synth.py) sent to POST /api/upload/bulk, with process pools of
+different sizes. With enough cores the time should fall with the worker
+count rather than grow with the number of files.
+
+    python bench_bulk.py [rows_per_dataset] [months] [workers ...]
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+import zipfile
+
+os.environ.setdefault("WARMUP", "0")
+# Throwaway user database and workspaces, so runs leave nothing behind
+_scratch = tempfile.TemporaryDirectory(prefix="paydrift-bench-")
+os.environ["DB_PATH"] = os.path.join(_scratch.name, "paydrift.db")
+os.environ["WORKSPACE_DIR"] = os.path.join(_scratch.name, "workspaces")
+
+from fastapi.testclient import TestClient
+
+import main
+from synth import make_datasets
+from workers import WorkerPool
+
+
+def write_zips(rows: int, months: int, directory: str) -> list[str]:
+    paths = []
+    for name, df in make_datasets(rows, months).items():
+        path = os.path.join(directory, f"{name}.zip")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            for month, part in df.groupby(df["month"].dt.strftime("%Y-%m")):
+                z.writestr(f"{name}/{month}.csv", part.to_csv(index=False, date_format="%Y-%m"))
+        paths.append(path)
+    return paths
+
+
+def run(rows=360_000, months=36, workers=None):
+    workers = workers or sorted({1, os.cpu_count() or 1})
+    with tempfile.TemporaryDirectory() as directory, TestClient(main.app) as client:
+        paths = write_zips(rows, months, directory)
+        email = f"bench-{uuid.uuid4().hex}@example.com"
+        r = client.post("/api/register", json={"email": email, "name": "Bench", "password": "bench"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        for n in workers:
+            main.parse_pool.shutdown()
+            main.parse_pool = WorkerPool("process", n, main.parse_pool.queue_limit)
+            files = [("files", (os.path.basename(p), open(p, "rb"))) for p in paths]
+            start = time.perf_counter()
+            r = client.post("/api/upload/bulk", files=files, headers=headers)
+            elapsed = time.perf_counter() - start
+            assert r.status_code == 200, r.text
+            print({"workers": n, "files": r.json()["files"], "rows": rows * len(paths),
+                   "seconds": round(elapsed, 2)})
+        main.parse_pool.shutdown()
+        client.post("/api/reset", headers=headers)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    run(*args[:2], workers=args[2:] or None)
@@ -0,0 +1,121 @@
+"""
+Micro-benchmark: column-wise build_category/merge_trends vs the old
+iterrows implementation. Checks the outputs are identical at each size.
+
+    python bench_drift.py [rows ...]
+"""
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from drift import build_category, merge_trends
+
+
+# --- Previous row-wise implementation, kept for comparison ---
+def build_category_iterrows(drift_df, category, label, group_cols):
+    items = []
+    for _, row in drift_df.iterrows():
+        item_name = " - ".join(str(row[c]) for c in group_cols)
+        items.append({
+            "item": item_name,
+            "category": category,
+            "avg_before": round(row["avg_before"], 2),
+            "avg_after": round(row["avg_after"], 2),
+            "drift": round(row["drift"], 2),
+            "drift_pct": round(row["drift_pct"], 2) if pd.notna(row["drift_pct"]) else 0.0,
+        })
+
+    total_before = drift_df["avg_before"].sum()
+    total_after = drift_df["avg_after"].sum()
+    total_drift = drift_df["drift"].sum()
+    cat_drift_pct = (total_drift / total_before * 100) if total_before != 0 else 0
+
+    return {
+        "category": category,
+        "label": label,
+        "total_drift": round(total_drift, 2),
+        "total_before": round(total_before, 2),
+        "total_after": round(total_after, 2),
+        "drift_pct": round(cat_drift_pct, 2),
+        "items": items,
+    }
+
+
+def merge_trends_lists(trends):
+    all_months = sorted(set(m for s in trends.values() for m in s.index.tolist()))
+    maps = {name: dict(zip(s.index, s)) for name, s in trends.items()}
+    out = []
+    for m in all_months:
+        point = {"month": m if isinstance(m, str) else m.strftime("%Y-%m")}
+        for name, mp in maps.items():
+            point[name] = round(mp.get(m, 0), 2)
+        out.append(point)
+    return out
+
+
+# --- Synthetic inputs ---
+def make_drift_df(n, seed=0):
+    rng = np.random.default_rng(seed)
+    before = rng.uniform(0, 20000, n).round(3)
+    before[rng.random(n) < 0.01] = 0  # exercises the NaN drift_pct path
+    after = before * rng.normal(1.05, 0.1, n)
+    drift = after - before
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drift_pct = np.where(before == 0, np.nan, drift / before * 100)
+    return pd.DataFrame({
+        "team": [f"Team {i % 97}" for i in range(n)],
+        "service": [f"Service {i}" for i in range(n)],
+        "avg_before": before,
+        "avg_after": after,
+        "drift": drift,
+        "drift_pct": drift_pct,
+    })
+
+
+def make_trends(n, seed=0):
+    rng = np.random.default_rng(seed)
+    months = pd.date_range("1900-01-01", periods=n, freq="MS")
+    return {
+        "people": pd.Series(rng.integers(0, 10**6, n), index=months),
+        "ai_llm": pd.Series(rng.uniform(0, 1e4, n), index=months).iloc[n // 10:],
+        "saas_cloud": pd.Series(rng.uniform(0, 1e4, n), index=months),
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(sizes):
+    results = []
+    for n in sizes:
+        df = make_drift_df(n)
+        old, t_old = timed(build_category_iterrows, df, "ai_llm", "AI/LLM", ["team", "service"])
+        new, t_new = timed(build_category, df, "ai_llm", "AI/LLM", ["team", "service"])
+        assert json.dumps(old) == json.dumps(new), f"build_category mismatch at {n} rows"
+
+        # Monthly trends are one row per month, so cap them at a realistic size
+        trends = make_trends(min(n, 1200))
+        old_t, t_old_t = timed(merge_trends_lists, trends)
+        new_t, t_new_t = timed(merge_trends, trends)
+        assert json.dumps(old_t) == json.dumps(new_t), f"merge_trends mismatch at {n} rows"
+
+        results.append({
+            "rows": n,
+            "build_category_iterrows_s": round(t_old, 4),
+            "build_category_vectorized_s": round(t_new, 4),
+            "speedup": round(t_old / t_new, 1),
+            "merge_trends_lists_s": round(t_old_t, 4),
+            "merge_trends_vectorized_s": round(t_new_t, 4),
+        })
+        print(results[-1])
+    return results
+
+
+if __name__ == "__main__":
+    run([int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,95 @@
+"""
+Load test: a burst of concurrent logins, and what it does to everyone
+else's /api/drift latency. Runs once with bcrypt called inline on the event
+loop (the old behaviour) and once on the auth hash pool.
+
+    python bench_login.py [logins] [drift_requests]
+"""
+import asyncio
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+# Throwaway user database and workspaces, so runs leave nothing behind
+_scratch = tempfile.TemporaryDirectory(prefix="paydrift-bench-")
+os.environ["DB_PATH"] = os.path.join(_scratch.name, "paydrift.db")
+os.environ["WORKSPACE_DIR"] = os.path.join(_scratch.name, "workspaces")
+
+import httpx
+
+import auth
+import main
+
+
+def summarize(latencies: list[float]) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "n": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(latencies[math.ceil(len(latencies) * 0.99) - 1], 1),
+        "max_ms": round(latencies[-1], 1),
+    }
+
+
+async def timed(client, method, url, start=None, **kwargs) -> float:
+    """Latency in ms, measured from `start` (default: now) to the response."""
+    start = start or time.perf_counter()
+    r = await client.request(method, url, **kwargs)
+    assert r.status_code == 200, r.text
+    return (time.perf_counter() - start) * 1000
+
+
+async def burst(client, email, headers, logins: int, drift_requests: int) -> dict:
+    body = {"email": email, "password": "bench-password"}
+    # All logins arrive at once; each one's latency includes its time in the queue
+    start = time.perf_counter()
+    login_tasks = [asyncio.create_task(timed(client, "POST", "/api/login", start, json=body))
+                   for _ in range(logins)]
+
+    # Dashboard traffic from another user while the logins are in flight
+    drift = []
+    while len(drift) < drift_requests and not all(t.done() for t in login_tasks):
+        drift.append(await timed(client, "GET", "/api/drift", headers=headers))
+        await asyncio.sleep(0.01)
+
+    return {"login": summarize(await asyncio.gather(*login_tasks)), "drift_during_burst": summarize(drift)}
+
+
+async def run(logins=50, drift_requests=200):
+    await main.startup()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        email = f"bench-{uuid.uuid4().hex}@example.com"
+        r = await client.post("/api/register", json={"email": email, "name": "Bench", "password": "bench-password"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        idle = [await timed(client, "GET", "/api/drift", headers=headers) for _ in range(20)]
+
+        pooled = await burst(client, email, headers, logins, drift_requests)
+
+        # Previous behaviour: bcrypt on the event loop
+        original = main.averify_password
+
+        async def verify_inline(plain, hashed):
+            return auth.verify_password(plain, hashed)
+
+        main.averify_password = verify_inline
+        try:
+            inline = await burst(client, email, headers, logins, drift_requests)
+        finally:
+            main.averify_password = original
+
+    await main.shutdown()
+    print({
+        "drift_idle": summarize(idle),
+        "before (bcrypt on event loop)": inline,
+        f"after (hash pool, {auth.AUTH_HASH_WORKERS} workers)": pooled,
+    })
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    asyncio.run(run(*args))
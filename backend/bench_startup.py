@@ -0,0 +1,101 @@
+"""
+Cold-start report. Imports main in a fresh interpreter with -X importtime
+to list the slowest top-level imports, then starts uvicorn and times how
+long the first GET /health takes to return 200. Each run is a new process,
+so nothing is cached between runs except the demo data snapshots on disk.
+The budget itself is checked by test_startup.py.
+
+    python bench_startup.py [--runs 3] [--top 12]
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STARTUP_BUDGET_S = float(os.getenv("STARTUP_BUDGET_S", "3.0"))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(top: int) -> tuple[float, list[tuple[str, float]]]:
+    """Total seconds to import main, and its slowest direct imports (cumulative seconds)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                          cwd=HERE, capture_output=True, text=True, check=True)
+    modules, total = [], 0.0
+    for line in proc.stderr.splitlines():
+        m = IMPORT_LINE.match(line)
+        if not m:
+            continue
+        seconds, depth, name = int(m[2]) / 1e6, len(m[3]), m[4]
+        if name == "main":
+            total = seconds
+        # Indent 1 = imported by the interpreter or main itself; 3 = by main
+        elif depth <= 3:
+            modules.append((name, round(seconds, 3)))
+    return round(total, 3), sorted(modules, key=lambda m: -m[1])[:top]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_health(timeout: float = 60) -> float:
+    """Seconds from launching uvicorn to the first 200 from /health."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    # Throwaway user database and workspaces, so runs leave nothing behind
+    scratch = tempfile.TemporaryDirectory(prefix="paydrift-bench-")
+    env = {**os.environ, "DB_PATH": os.path.join(scratch.name, "paydrift.db"),
+           "WORKSPACE_DIR": os.path.join(scratch.name, "workspaces")}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"/health did not return 200 within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+        scratch.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=12, help="slowest imports to list")
+    args = parser.parse_args()
+
+    total, modules = import_times(args.top)
+    print(f"import main: {total:.3f}s")
+    for name, seconds in modules:
+        print(f"  {seconds:7.3f}s  {name}")
+
+    runs = []
+    for _ in range(args.runs):
+        seconds = time_to_health()
+        runs.append(seconds)
+        print(f"first /health 200 after {seconds:.3f}s")
+
+    print(f"median time to first /health: {statistics.median(runs):.3f}s (budget {STARTUP_BUDGET_S:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
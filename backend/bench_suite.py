@@ -0,0 +1,226 @@
+"""
+Scaling benchmarks for the drift engine on synthetic data (see synth.py).
+Each (case, rows) pair runs in a fresh interpreter so its peak RSS is its
+own (on Linux, measured from after the data is generated); total_s is the
+sum of the timed steps only. Results go to a JSON file named after the
+current commit, so runs can be diffed across commits.
+
+    python bench_suite.py [--rows 10000 100000 1000000] [--cases drift parse api json]
+                          [--out FILE] [--compare OLD.json]
+
+Cases:
+    drift  calculate_drift + monthly_trend per dataset, then analyze_all
+    parse  read_upload() of each dataset's CSV
+    api    GET /api/drift through the FastAPI test client, cold and cached
+    json   json.dumps of the analyze_all result
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+CASES = ["drift", "parse", "api", "json"]
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results")
+
+
+def _proc_status_mb(field: str) -> float | None:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb() -> float | None:
+    return _proc_status_mb("VmRSS")
+
+
+def peak_rss_mb() -> float:
+    peak = _proc_status_mb("VmHWM")
+    if peak is not None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def reset_peak_rss():
+    """Start peak RSS tracking from the current RSS (Linux only; elsewhere a no-op)."""
+    gc.collect()
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def timed(timings: dict, label: str, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    timings[label] = round(time.perf_counter() - start, 4)
+    return result
+
+
+# --- Cases (each runs inside its own child process) ---
+def case_drift(datasets, timings):
+    from drift import DRIFT_COLUMNS, analyze_all, calculate_drift, monthly_trend
+
+    for name, (date_col, amount_col, group_cols) in DRIFT_COLUMNS.items():
+        df = datasets[name]
+        timed(timings, f"calculate_drift.{name}", calculate_drift, df, date_col, amount_col, group_cols)
+        timed(timings, f"monthly_trend.{name}", monthly_trend, df, date_col, amount_col)
+    timed(timings, "analyze_all", analyze_all, datasets)
+
+
+def case_parse(datasets, timings):
+    from ingest import read_upload
+    from synth import write_csvs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_csvs(datasets, tmp)
+        reset_peak_rss()
+        for name in datasets:
+            path = os.path.join(tmp, f"{name}.csv")
+            timed(timings, f"read_upload.{name}", read_upload, path, f"{name}.csv", name)
+
+
+def case_api(datasets, timings):
+    import uuid
+
+    from fastapi.testclient import TestClient
+
+    os.environ["WARMUP"] = "0"   # no background warm-up competing with the timings
+    # Throwaway user database and workspaces, so runs leave nothing behind
+    scratch = tempfile.TemporaryDirectory(prefix="paydrift-bench-")
+    os.environ["DB_PATH"] = os.path.join(scratch.name, "paydrift.db")
+    os.environ["WORKSPACE_DIR"] = os.path.join(scratch.name, "workspaces")
+    import main
+    from store import compact
+
+    with scratch, TestClient(main.app) as client:
+        for name, df in datasets.items():
+            main.workspaces.demo.put(name, compact(df, name))
+        main.workspaces.demo_loaded = True
+        email = f"bench-{uuid.uuid4().hex}@example.com"
+        r = client.post("/api/register", json={"email": email, "name": "Bench", "password": "bench"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        for label in ("api_drift.cold", "api_drift.cached"):
+            r = timed(timings, label, lambda: client.get("/api/drift", headers=headers))
+            assert r.status_code == 200, r.text
+        return {"response_bytes": len(r.content)}
+
+
+def case_json(datasets, timings):
+    from drift import analyze_all
+
+    result = analyze_all(datasets)
+    body = timed(timings, "json_dumps", lambda: json.dumps(result, default=float))
+    return {"response_bytes": len(body)}
+
+
+def run_case(case: str, rows: int, seed: int) -> dict:
+    from synth import make_datasets
+
+    datasets = make_datasets(rows, seed=seed)
+    timings = {}
+    reset_peak_rss()
+    baseline = rss_mb()
+    info = globals()[f"case_{case}"](datasets, timings) or {}
+    return {
+        "case": case,
+        "rows": rows,
+        "total_s": round(sum(timings.values()), 4),
+        "timings": timings,
+        **info,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+# --- Driver ---
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old: dict, new: dict):
+    """Print total_s and peak_rss_mb of `new` relative to `old` for matching cases."""
+    before = {(r["case"], r["rows"]): r for r in old["results"]}
+    print(f"\n{old['commit']} -> {new['commit']}")
+    for r in new["results"]:
+        o = before.get((r["case"], r["rows"]))
+        if o is None or "error" in o or "error" in r:
+            continue
+        print(f"  {r['case']:<6} {r['rows']:>10,} rows  "
+              f"time x{r['total_s'] / max(o['total_s'], 1e-9):.2f}  "
+              f"peak RSS x{r['peak_rss_mb'] / max(o['peak_rss_mb'], 1e-9):.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out")
+    parser.add_argument("--compare")
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "ROWS"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_case(args.child[0], int(args.child[1]), args.seed)))
+        return
+
+    import pandas as pd
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": [],
+    }
+    here = os.path.dirname(os.path.abspath(__file__))
+    for rows in args.rows:
+        for case in args.cases:
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", case, str(rows),
+                 "--seed", str(args.seed)],
+                cwd=here, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                result = {"case": case, "rows": rows, "error": proc.stderr.strip().splitlines()[-1:]}
+            else:
+                result = json.loads(proc.stdout.strip().splitlines()[-1])
+            report["results"].append(result)
+            print(result)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
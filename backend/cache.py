@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import aiosqlite
+
+# Every dataset write (upload, reset) takes a fresh number from this counter,
+# so a cache key built from versions can never be reused by different data.
+_version_counter = itertools.count(1)
+
+
+def next_version() -> int:
+    """Return a new, never-before-used dataset version number."""
+    return next(_version_counter)
+
+
+class VersionedCache:
+    """
+    Memoizes results computed from the datasets, keyed on their versions.
+    When a dataset is replaced its version changes, so old entries simply
+    stop being looked up and age out of the LRU.
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: dict = {}   # key -> task computing it (aget_or_compute only)
+
+    def get_or_compute(self, key, compute):
+        found, value = self._lookup(key)
+        if found:
+            return value
+        value = compute()
+        self._store(key, value)
+        return value
+
+    async def aget_or_compute(self, key, compute):
+        """
+        Like get_or_compute(), but `compute()` returns an awaitable.
+        Concurrent misses for the same key share one computation; if it
+        fails, nothing is stored and the next caller tries again.
+        """
+        found, value = self._lookup(key)
+        if found:
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute_and_store(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: one caller disconnecting must not cancel the shared computation
+        return await asyncio.shield(task)
+
+    async def _compute_and_store(self, key, compute):
+        value = await compute()
+        self._store(key, value)
+        return value
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return True, self._data[key]
+        return False, None
+
+    def _store(self, key, value):
+        with self._lock:
+            self.misses += 1
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._data),
+            "inflight": len(self._inflight),
+        }
+
+
+class ResponseCache:
+    """
+    Content-addressed cache for LLM responses with TTL and LRU eviction,
+    optionally persisted to SQLite so answers survive restarts.
+    Concurrent requests for the same key share a single upstream call.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 3600, db_path: str | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._data: OrderedDict = OrderedDict()  # key -> (stored_at, value)
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._db_ready = False
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        return hashlib.sha256("\x00".join(parts).encode()).hexdigest()
+
+    async def get_or_call(self, key: str, call) -> str:
+        """Return the cached value for key, or await call() once and cache it."""
+        value = await self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._call_and_store(key, call))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: one caller disconnecting must not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def _call_and_store(self, key: str, call) -> str:
+        value = await call()
+        await self.set(key, value)
+        return value
+
+    async def get(self, key: str) -> str | None:
+        entry = self._data.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if time.time() - stored_at < self.ttl:
+                self._data.move_to_end(key)
+                return value
+            del self._data[key]
+
+        if self.db_path:
+            await self._init_db()
+            async with aiosqlite.connect(self.db_path) as db:
+                cursor = await db.execute(
+                    "SELECT stored_at, value FROM responses WHERE key = ?", (key,),
+                )
+                row = await cursor.fetchone()
+            if row is not None and time.time() - row[0] < self.ttl:
+                self._remember(key, row[0], row[1])
+                return row[1]
+        return None
+
+    async def set(self, key: str, value: str):
+        stored_at = time.time()
+        self._remember(key, stored_at, value)
+        if self.db_path:
+            await self._init_db()
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute(
+                    "INSERT OR REPLACE INTO responses (key, stored_at, value) VALUES (?, ?, ?)",
+                    (key, stored_at, value),
+                )
+                await db.execute("DELETE FROM responses WHERE stored_at < ?", (stored_at - self.ttl,))
+                await db.commit()
+
+    def _remember(self, key: str, stored_at: float, value: str):
+        self._data[key] = (stored_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def _init_db(self):
+        if self._db_ready:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    stored_at REAL NOT NULL,
+                    value TEXT NOT NULL
+                )
+            """)
+            await db.commit()
+        self._db_ready = True
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._data),
+            "inflight": len(self._inflight),
+            "persistent": bool(self.db_path),
+        }
@@ -1,12 +1,78 @@
-import aiosqlite
+import asyncio
 import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+from metrics import span
+
+# --- Config ---
+DB_PATH = os.getenv("DB_PATH", os.path.join(os.path.dirname(__file__), "paydrift.db"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))   # seconds; 0 disables
+USER_CACHE_SIZE = 10_000
+
+
+class ConnectionPool:
+    """
+    Long-lived aiosqlite connections in WAL mode, so requests don't pay for
+    a new thread + file open each time. WAL lets readers run alongside the
+    (serialized) writer; sqlite3's statement cache keeps queries prepared.
+    """
+
+    def __init__(self, path: str, size: int = DB_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle: asyncio.Queue | None = None
+        self._all: list[aiosqlite.Connection] = []
+        self._lock = asyncio.Lock()
+
+    async def _open(self):
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            db = await aiosqlite.connect(self.path, cached_statements=64)
+            db.row_factory = aiosqlite.Row
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute("PRAGMA synchronous=NORMAL")
+            await db.execute("PRAGMA busy_timeout=5000")
+            self._all.append(db)
+            self._idle.put_nowait(db)
+
+    @asynccontextmanager
+    async def connection(self):
+        if self._idle is None:
+            async with self._lock:
+                if self._idle is None:
+                    await self._open()
+        db = await self._idle.get()
+        try:
+            yield db
+        finally:
+            self._idle.put_nowait(db)
+
+    async def close(self):
+        for db in self._all:
+            await db.close()
+        self._all = []
+        self._idle = None
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "paydrift.db")
+
+pool = ConnectionPool(DB_PATH)
+
+# --- User lookup cache (email -> (expires_at, user)) ---
+_user_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+
+def invalidate_user(email: str):
+    """Drop a cached user record; call after any change to that user."""
+    _user_cache.pop(email, None)
 
 
 async def init_db():
     """Create the users table if it doesn't exist."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with pool.connection() as db:
         await db.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -18,25 +84,42 @@ async def init_db():
         await db.commit()
 
 
+async def close_db():
+    await pool.close()
+
+
 async def get_user_by_email(email: str) -> dict | None:
-    """Return user dict or None."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT email, name, hashed_password FROM users WHERE email = ?",
-            (email,),
-        )
-        row = await cursor.fetchone()
-        if row is None:
-            return None
-        return {"email": row["email"], "name": row["name"], "hashed_password": row["hashed_password"]}
+    """Return user dict or None. Found users are cached for USER_CACHE_TTL seconds."""
+    cached = _user_cache.get(email)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    with span("db.get_user_by_email"):
+        async with pool.connection() as db:
+            cursor = await db.execute(
+                "SELECT email, name, hashed_password FROM users WHERE email = ?",
+                (email,),
+            )
+            row = await cursor.fetchone()
+            await cursor.close()
+    if row is None:
+        return None
+
+    user = {"email": row["email"], "name": row["name"], "hashed_password": row["hashed_password"]}
+    if USER_CACHE_TTL > 0:
+        _user_cache[email] = (time.monotonic() + USER_CACHE_TTL, user)
+        _user_cache.move_to_end(email)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+    return user
 
 
 async def create_user(email: str, name: str, hashed_password: str):
     """Insert a new user. Raises IntegrityError if email already exists."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with pool.connection() as db:
         await db.execute(
             "INSERT INTO users (email, name, hashed_password) VALUES (?, ?, ?)",
             (email, name, hashed_password),
         )
         await db.commit()
+    invalidate_user(email)
@@ -3,6 +3,13 @@ from pathlib import Path
 
 DATA_DIR = Path(__file__).parent / "data"
 
+# Source CSV of each demo dataset
+DEMO_FILES = {
+    "payroll": "payroll.csv",
+    "ai_costs": "ai_costs.csv",
+    "saas_cloud": "saas_cloud.csv",
+}
+
 
 def load_payroll() -> pd.DataFrame:
     df = pd.read_csv(DATA_DIR / "payroll.csv")
@@ -36,8 +43,11 @@ def load_all() -> dict[str, pd.DataFrame]:
 
 def df_preview(df: pd.DataFrame, n: int = 5) -> list[dict]:
     """Return first n rows as list of dicts (for API response)."""
-    # Convert timestamps to strings so JSON serialization works
+    # Convert timestamps/periods to strings so JSON serialization works
     preview = df.head(n).copy()
     for col in preview.select_dtypes(include=["datetime64"]).columns:
         preview[col] = preview[col].dt.strftime("%Y-%m")
+    for col in preview.columns:
+        if isinstance(preview[col].dtype, pd.PeriodDtype):
+            preview[col] = preview[col].dt.strftime("%Y-%m")
     return preview.to_dict(orient="records")
\ No newline at end of file
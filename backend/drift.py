@@ -1,85 +1,176 @@
+import numpy as np
 import pandas as pd
 from demo_data import load_all
+from metrics import span
 
 
-def calculate_drift(df, date_col, amount_col, group_cols, n_periods=3):
-    dates_sorted = sorted(df[date_col].unique())
+# Columns each dataset's drift is computed from: (date_col, amount_col, group_cols)
+DRIFT_COLUMNS = {
+    "payroll": ("month", "total", ["department", "type"]),
+    "ai_costs": ("month", "cost", ["team", "service"]),
+    "saas_cloud": ("month", "monthly_cost", ["service"]),
+}
+
+# (category, label) each dataset is reported under
+CATEGORIES = {
+    "payroll": ("people", "People"),
+    "ai_costs": ("ai_llm", "AI/LLM"),
+    "saas_cloud": ("saas_cloud", "SaaS/Cloud"),
+}
+
+
+@span("drift.group_month_totals")
+def group_month_totals(df, date_col, amount_col, group_cols) -> pd.DataFrame:
+    """
+    Sum and count of amount_col per (group..., month). Drift windows and
+    monthly trends are both derived from this table, which is small
+    (groups x months) and can be extended with add_totals() on append.
+    """
+    return df.groupby(group_cols + [date_col], observed=True, dropna=False)[amount_col].agg(["sum", "count"])
+
+
+def add_totals(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    """Combine two group_month_totals() tables, e.g. history + appended rows."""
+    combined = a.add(b, fill_value=0)
+    return combined.astype({c: np.result_type(a[c].dtype, b[c].dtype) for c in combined.columns})
+
+
+@span("drift.drift_from_totals")
+def drift_from_totals(totals, date_col, group_cols, n_periods=3):
+    months = totals.index.get_level_values(date_col)
+    dates_sorted = sorted(months.dropna().unique())
     cutoff = dates_sorted[-n_periods]
 
-    before = df[df[date_col] < cutoff].groupby(group_cols)[amount_col].mean()
-    after = df[df[date_col] >= cutoff].groupby(group_cols)[amount_col].mean()
+    before = totals[months < cutoff].groupby(level=group_cols, observed=True).sum()
+    after = totals[months >= cutoff].groupby(level=group_cols, observed=True).sum()
 
-    result = pd.DataFrame({"avg_before": before, "avg_after": after}).fillna(0)
+    result = pd.DataFrame({
+        "avg_before": before["sum"] / before["count"],
+        "avg_after": after["sum"] / after["count"],
+    }).fillna(0)
     result["drift"] = result["avg_after"] - result["avg_before"]
     result["drift_pct"] = (result["drift"] / result["avg_before"].replace(0, float("nan"))) * 100
     return result.sort_values("drift", key=abs, ascending=False).reset_index()
 
 
+def trend_from_totals(totals, date_col) -> pd.Series:
+    """Total spend per month, indexed by month."""
+    return totals["sum"].groupby(level=date_col).sum()
+
+
+def calculate_drift(df, date_col, amount_col, group_cols, n_periods=3):
+    totals = group_month_totals(df, date_col, amount_col, group_cols)
+    return drift_from_totals(totals, date_col, group_cols, n_periods)
+
+
 def monthly_trend(df, date_col, amount_col):
     return df.groupby(date_col)[amount_col].sum().reset_index()
 
 
-def utilization_flag(df, date_col, total_col, active_col, service_col, threshold=0.3):
-    latest = df[df[date_col] == df[date_col].max()].copy()
-    latest = latest[latest[total_col] != ""]
-    latest[total_col] = latest[total_col].astype(float)
-    latest[active_col] = latest[active_col].astype(float)
-    latest["utilization"] = latest[active_col] / latest[total_col]
-    latest["flagged"] = latest["utilization"] < threshold
-    return latest[[service_col, total_col, active_col, "utilization", "flagged"]]
+def round2(values) -> np.ndarray:
+    """
+    Vectorized round(x, 2) that matches Python's built-in round() exactly.
+    np.round scales by 100 in floating point, which can land on the wrong
+    side of a .xx5 tie, so the few values that close to a tie use round().
+    """
+    values = np.asarray(values, dtype="float64")
+    out = np.round(values, 2)
+    with np.errstate(invalid="ignore"):
+        scaled = values * 100
+        frac = np.abs(scaled - np.trunc(scaled))
+        near_tie = np.abs(frac - 0.5) <= np.abs(scaled) * 1e-15
+    for i in np.flatnonzero(near_tie):
+        out[i] = round(float(values[i]), 2)
+    return out
+
+
+def to_records(columns: dict) -> list[dict]:
+    """Turn equal-length column arrays into a list of row dicts in one pass."""
+    keys = list(columns)
+    values = [v.tolist() if hasattr(v, "tolist") else v for v in columns.values()]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+@span("drift.build_category")
+def build_category(drift_df, category, label, group_cols) -> dict:
+    """Summarize one calculate_drift() result as a DriftSummary dict."""
+    item_names = drift_df[group_cols[0]].astype(str)
+    for c in group_cols[1:]:
+        item_names = item_names + " - " + drift_df[c].astype(str)
+
+    drift_pct = round2(drift_df["drift_pct"])
+    items = to_records({
+        "item": item_names.to_numpy(dtype=object),
+        "category": [category] * len(drift_df),
+        "avg_before": round2(drift_df["avg_before"]),
+        "avg_after": round2(drift_df["avg_after"]),
+        "drift": round2(drift_df["drift"]),
+        "drift_pct": np.where(np.isnan(drift_pct), 0.0, drift_pct),
+    })
+
+    total_before = drift_df["avg_before"].sum()
+    total_after = drift_df["avg_after"].sum()
+    total_drift = drift_df["drift"].sum()
+    cat_drift_pct = (total_drift / total_before * 100) if total_before != 0 else 0
 
+    return {
+        "category": category,
+        "label": label,
+        "total_drift": round(total_drift, 2),
+        "total_before": round(total_before, 2),
+        "total_after": round(total_after, 2),
+        "drift_pct": round(cat_drift_pct, 2),
+        "items": items,
+    }
+
+
+@span("drift.merge_trends")
+def merge_trends(trends: dict[str, pd.Series]) -> list[dict]:
+    """
+    Outer-join month-indexed trend series into TrendPoint dicts.
+    Months missing from a series report 0.
+    """
+    all_months = trends[next(iter(trends))].index
+    for series in trends.values():
+        all_months = all_months.union(series.index)
+    all_months = all_months.sort_values()
+
+    if pd.api.types.is_datetime64_any_dtype(all_months):
+        month_strs = all_months.strftime("%Y-%m")
+    else:
+        month_strs = all_months.astype(str)
+    columns = {"month": np.asarray(month_strs, dtype=object)}
 
-def analyze_all(datasets: dict[str, pd.DataFrame] = None) -> dict:
+    for name, series in trends.items():
+        if pd.api.types.is_integer_dtype(series):
+            columns[name] = series.reindex(all_months, fill_value=0).to_numpy()
+        else:
+            values = pd.Series(round2(series), index=series.index).reindex(all_months)
+            columns[name] = values.astype(object).where(values.notna(), 0).to_numpy()
+
+    return to_records(columns)
+
+
+def analyze_all(datasets: dict[str, pd.DataFrame] = None, totals: dict[str, pd.DataFrame] = None) -> dict:
     """
     Run drift calculations on all 3 datasets.
     Returns structured data matching DriftResponse model.
+    `totals` may hold group_month_totals() tables that are already up to
+    date (see DatasetStore.append); missing ones are built from the frames.
     """
     if datasets is None:
         datasets = load_all()
-
-    payroll = datasets["payroll"]
-    ai_costs = datasets["ai_costs"]
-    saas = datasets["saas_cloud"]
+    totals = dict(totals or {})
+    for name, (date_col, amount_col, group_cols) in DRIFT_COLUMNS.items():
+        if name not in totals:
+            totals[name] = group_month_totals(datasets[name], date_col, amount_col, group_cols)
 
     # --- Drift calculations ---
-    payroll_drift = calculate_drift(payroll, "month", "total", ["department", "type"])
-    ai_drift = calculate_drift(ai_costs, "month", "cost", ["team", "service"])
-    saas_drift = calculate_drift(saas, "month", "monthly_cost", ["service"])
-
-    # --- Monthly trends ---
-    payroll_trend = monthly_trend(payroll, "month", "total")
-    ai_trend = monthly_trend(ai_costs, "month", "cost")
-    saas_trend = monthly_trend(saas, "month", "monthly_cost")
+    payroll_drift = drift_from_totals(totals["payroll"], "month", ["department", "type"])
+    ai_drift = drift_from_totals(totals["ai_costs"], "month", ["team", "service"])
+    saas_drift = drift_from_totals(totals["saas_cloud"], "month", ["service"])
 
     # --- Build category summaries ---
-    def build_category(drift_df, category, label, group_cols):
-        items = []
-        for _, row in drift_df.iterrows():
-            item_name = " - ".join(str(row[c]) for c in group_cols)
-            items.append({
-                "item": item_name,
-                "category": category,
-                "avg_before": round(row["avg_before"], 2),
-                "avg_after": round(row["avg_after"], 2),
-                "drift": round(row["drift"], 2),
-                "drift_pct": round(row["drift_pct"], 2) if pd.notna(row["drift_pct"]) else 0.0,
-            })
-
-        total_before = drift_df["avg_before"].sum()
-        total_after = drift_df["avg_after"].sum()
-        total_drift = drift_df["drift"].sum()
-        cat_drift_pct = (total_drift / total_before * 100) if total_before != 0 else 0
-
-        return {
-            "category": category,
-            "label": label,
-            "total_drift": round(total_drift, 2),
-            "total_before": round(total_before, 2),
-            "total_after": round(total_after, 2),
-            "drift_pct": round(cat_drift_pct, 2),
-            "items": items,
-        }
-
     categories = [
         build_category(payroll_drift, "people", "People", ["department", "type"]),
         build_category(ai_drift, "ai_llm", "AI/LLM", ["team", "service"]),
@@ -88,25 +179,11 @@ def analyze_all(datasets: dict[str, pd.DataFrame] = None) -> dict:
 
     # --- Build monthly trends ---
     # Merge all 3 trends into one list of {month, people, ai_llm, saas_cloud}
-    all_months = sorted(set(
-        payroll_trend["month"].tolist() +
-        ai_trend["month"].tolist() +
-        saas_trend["month"].tolist()
-    ))
-
-    p_map = dict(zip(payroll_trend["month"], payroll_trend["total"]))
-    a_map = dict(zip(ai_trend["month"], ai_trend["cost"]))
-    s_map = dict(zip(saas_trend["month"], saas_trend["monthly_cost"]))
-
-    monthly_trends = []
-    for m in all_months:
-        month_str = m if isinstance(m, str) else m.strftime("%Y-%m")
-        monthly_trends.append({
-            "month": month_str,
-            "people": round(p_map.get(m, 0), 2),
-            "ai_llm": round(a_map.get(m, 0), 2),
-            "saas_cloud": round(s_map.get(m, 0), 2),
-        })
+    monthly_trends = merge_trends({
+        "people": trend_from_totals(totals["payroll"], "month"),
+        "ai_llm": trend_from_totals(totals["ai_costs"], "month"),
+        "saas_cloud": trend_from_totals(totals["saas_cloud"], "month"),
+    })
 
     # --- Totals ---
     total_monthly_drift = sum(c["total_drift"] for c in categories)
@@ -117,4 +194,19 @@ def analyze_all(datasets: dict[str, pd.DataFrame] = None) -> dict:
         "annualized_drift": round(annualized_drift, 2),
         "categories": categories,
         "monthly_trends": monthly_trends,
-    }
\ No newline at end of file
+    }
+
+
+def page_items(drift_data: dict, limit: int | None = None, offset: int = 0) -> dict:
+    """
+    analyze_all() output with each category's items cut to items[offset:offset + limit].
+    Category totals still cover every item; `items_total` says how many there are.
+    """
+    if limit is None and offset == 0:
+        return drift_data
+    end = None if limit is None else offset + limit
+    categories = [
+        {**cat, "items": cat["items"][offset:end], "items_total": len(cat["items"])}
+        for cat in drift_data["categories"]
+    ]
+    return {**drift_data, "categories": categories}
@@ -0,0 +1,259 @@
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Rows parsed per chunk when streaming a CSV upload
+CHUNK_ROWS = 100_000
+
+# Bulk uploads (several files, or zips of them)
+UPLOAD_EXTENSIONS = (".csv", ".xlsx", ".xls")
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "1000"))
+BULK_MAX_MB = float(os.getenv("BULK_MAX_MB", "1024"))   # uncompressed, per request
+
+# Column types for the known datasets (same columns as data/*.csv)
+#   dimension -> categorical, month -> monthly Period,
+#   integer   -> smallest int dtype that holds the values (float64 if blanks),
+#   float     -> float64 (money; float32 would change the drift sums),
+#   count     -> float32 when that is lossless, else float64
+SCHEMAS: dict[str, dict[str, str]] = {
+    "payroll": {
+        "employee_id": "dimension",
+        "name": "dimension",
+        "department": "dimension",
+        "role": "dimension",
+        "band": "dimension",
+        "type": "dimension",
+        "month": "month",
+        "base_salary": "integer",
+        "overtime": "integer",
+        "total": "integer",
+    },
+    "ai_costs": {
+        "team": "dimension",
+        "service": "dimension",
+        "model": "dimension",
+        "month": "month",
+        "api_calls": "integer",
+        "tokens_used": "integer",
+        "cost": "float",
+    },
+    "saas_cloud": {
+        "service": "dimension",
+        "category": "dimension",
+        "month": "month",
+        "total_seats": "count",
+        "active_seats": "count",
+        "monthly_cost": "integer",
+    },
+}
+
+
+def _read_dtypes(schema: dict[str, str]) -> dict[str, str]:
+    """dtype= mapping for pd.read_csv. Numbers parse as float64 so blanks never fail."""
+    return {
+        col: "str" if kind in ("dimension", "month") else "float64"
+        for col, kind in schema.items()
+    }
+
+
+def compact_chunk(df: pd.DataFrame, schema: dict[str, str]) -> pd.DataFrame:
+    """Convert one parsed chunk to compact dtypes according to the schema."""
+    for col, kind in schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if kind == "dimension":
+            df[col] = values.astype("category")
+        elif kind == "month":
+            if not isinstance(values.dtype, pd.PeriodDtype):
+                df[col] = pd.to_datetime(values).dt.to_period("M")
+        elif kind == "integer":
+            if values.notna().all() and (values % 1 == 0).all():
+                df[col] = pd.to_numeric(values.astype("int64"), downcast="integer")
+        elif kind == "count":
+            as_f32 = values.astype("float32")
+            if np.array_equal(as_f32.astype("float64"), values, equal_nan=True):
+                df[col] = as_f32
+    return df
+
+
+def concat_chunks(chunks: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate compacted chunks, merging categorical dictionaries."""
+    if len(chunks) == 1:
+        return chunks[0]
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [c[col] for c in chunks]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            columns[col] = pd.Series(union_categoricals(parts, sort_categories=True))
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def read_csv_chunked(f, dataset_type: str, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Parse a CSV file object chunk by chunk. Each chunk is compacted before
+    the next one is read, so peak memory is the compact result plus one
+    raw chunk rather than the whole file plus the whole raw DataFrame.
+    """
+    schema = SCHEMAS.get(dataset_type, {})
+
+    # Read the header first so dtypes line up with stripped column names
+    names = [c.strip() for c in pd.read_csv(f, nrows=0).columns]
+    f.seek(0)
+    dtypes = {c: t for c, t in _read_dtypes(schema).items() if c in names}
+
+    reader = pd.read_csv(f, header=0, names=names, dtype=dtypes, chunksize=chunk_rows)
+    chunks = [compact_chunk(chunk, schema) for chunk in reader]
+    if not chunks:
+        return pd.DataFrame(columns=names)
+    return concat_chunks(chunks)
+
+
+def spool_to_path(f, filename: str) -> str:
+    """
+    Copy an upload to a named temp file, for worker processes that can't
+    share the in-memory file object. Caller deletes the file.
+    """
+    suffix = os.path.splitext(filename)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as out:
+        shutil.copyfileobj(f, out, 1024 * 1024)
+    return out.name
+
+
+def categorize_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Turn any remaining text columns (e.g. ones outside the schema) into categoricals, in place."""
+    for col in df.columns:
+        if pd.api.types.is_string_dtype(df[col]) or df[col].dtype == object:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def read_upload(f, filename: str, dataset_type: str) -> pd.DataFrame:
+    """
+    Parse an uploaded .csv/.xlsx/.xls file (object or path) into a compact
+    DataFrame, ready for DatasetStore.put() without another pass.
+    """
+    if isinstance(f, str):
+        with open(f, "rb") as fh:
+            return read_upload(fh, filename, dataset_type)
+
+    if filename.endswith(".csv"):
+        return categorize_text(read_csv_chunked(f, dataset_type))
+
+    df = pd.read_excel(f)
+    df.columns = df.columns.str.strip()
+    return categorize_text(compact_chunk(df, SCHEMAS.get(dataset_type, {})))
+
+
+# --- Bulk uploads ---
+def unpack_uploads(uploads: list[tuple], directory: str) -> list[tuple[str, str]]:
+    """
+    Copy uploaded files into `directory`, extracting .zip archives, so
+    worker processes can read them by path. Returns (path, name) for each
+    data file, where name is the original file name (or path inside the
+    zip). Raises ValueError past BULK_MAX_FILES files or BULK_MAX_MB bytes.
+    """
+    entries, total = [], 0
+
+    def add(name: str, size: int, src):
+        nonlocal total
+        total += size
+        if len(entries) >= BULK_MAX_FILES:
+            raise ValueError(f"Too many files (limit {BULK_MAX_FILES})")
+        if total > BULK_MAX_MB * 1024 * 1024:
+            raise ValueError(f"Upload is larger than {BULK_MAX_MB:g} MB uncompressed")
+        # Stored under an index, never under the uploaded name
+        path = os.path.join(directory, f"{len(entries)}{os.path.splitext(name)[1].lower()}")
+        with open(path, "wb") as out:
+            shutil.copyfileobj(src, out, 1024 * 1024)
+        entries.append((path, name))
+
+    for f, filename in uploads:
+        if filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(f) as archive:
+                for info in archive.infolist():
+                    base = os.path.basename(info.filename)
+                    if (info.is_dir() or base.startswith(".") or "__MACOSX" in info.filename
+                            or not base.lower().endswith(UPLOAD_EXTENSIONS)):
+                        continue
+                    with archive.open(info) as src:
+                        add(info.filename, info.file_size, src)
+        elif filename.lower().endswith(UPLOAD_EXTENSIONS):
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(0)
+            add(filename, size, f)
+        else:
+            raise ValueError(f"{filename}: file must be .csv, .xlsx, .xls or .zip")
+    return entries
+
+
+def split_batches(entries: list[tuple[str, str]], n: int) -> list[list[tuple[str, str]]]:
+    """Spread files over at most n batches with roughly equal bytes (largest first)."""
+    batches = [[] for _ in range(max(1, min(n, len(entries))))]
+    sizes = [0] * len(batches)
+    for entry in sorted(entries, key=lambda e: -os.path.getsize(e[0])):
+        i = sizes.index(min(sizes))
+        batches[i].append(entry)
+        sizes[i] += os.path.getsize(entry[0])
+    return [b for b in batches if b]
+
+
+def dataset_from_name(name: str) -> str | None:
+    """The dataset named at the start of a file name or folder (payroll/2025-01.csv, ai-costs_2025-01.csv)."""
+    for part in re.split(r"[\\/]", name.lower().replace("-", "_")):
+        for dataset_type in SCHEMAS:
+            if part.startswith(dataset_type):
+                return dataset_type
+    return None
+
+
+def dataset_from_columns(name: str, columns) -> str:
+    """The dataset whose schema has exactly these columns; ValueError if none does."""
+    columns = {str(c).strip() for c in columns}
+    for dataset_type, schema in SCHEMAS.items():
+        if columns == set(schema):
+            return dataset_type
+    raise ValueError(f"{name}: can't tell which dataset this is; name it after one of "
+                     f"{list(SCHEMAS)} or use one of their column sets")
+
+
+def check_schema(df: pd.DataFrame, dataset_type: str, name: str) -> pd.DataFrame:
+    """The frame with its columns in schema order; ValueError if they differ or a month is blank."""
+    expected = list(SCHEMAS[dataset_type])
+    missing, extra = set(expected) - set(df.columns), set(df.columns) - set(expected)
+    if missing or extra:
+        raise ValueError(f"{name}: {dataset_type} columns don't match; "
+                         f"missing {sorted(missing)}, unexpected {sorted(extra)}")
+    if df["month"].isna().any():
+        raise ValueError(f"{name}: blank or invalid month values")
+    return df[expected]
+
+
+def parse_files(entries: list[tuple[str, str]]) -> list[tuple[str, str, pd.DataFrame]]:
+    """
+    Parse a batch of (path, name) files on one worker: find each file's
+    dataset (from its name, else its columns), read it and check it
+    against that dataset's schema.
+    Returns (name, dataset_type, df) per file.
+    """
+    parsed = []
+    for path, name in entries:
+        dataset_type = dataset_from_name(name)
+        if dataset_type is None:
+            reader = pd.read_csv if name.lower().endswith(".csv") else pd.read_excel
+            dataset_type = dataset_from_columns(name, reader(path, nrows=0).columns)
+        try:
+            df = read_upload(path, name, dataset_type)
+        except Exception as e:
+            raise ValueError(f"{name}: failed to parse: {e}")
+        parsed.append((name, dataset_type, check_schema(df, dataset_type, name)))
+    return parsed
@@ -1,21 +1,55 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+import time
+
+# Cold-start report (see GET /api/stats and bench_startup.py)
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-from io import BytesIO
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from contextlib import aclosing
 
 from models import (
-    RawDataResponse, DriftResponse, UploadResponse,
+    RawDataResponse, DriftResponse, UploadResponse, BulkUploadResponse, CompareResponse, AnomalyResponse,
+    ScenarioRequest, ScenarioResponse, UtilizationResponse,
     ChatRequest, ChatResponse,
     UserRegister, UserLogin, TokenResponse,
 )
-from demo_data import load_all, df_preview
-from drift import analyze_all
-from agent import format_drift_for_ai, analyze_drift, chat_with_agent
+from demo_data import df_preview
+from drift import DRIFT_COLUMNS, analyze_all, page_items
+from payload import EncodedPayload, payload_response
+from cube import DriftCube, compare_all, resolve_windows
+from anomalies import SIGNALS, employee_signals, top_offenders
+from utilization import SORTS, rank_services, service_utilization
+from scenarios import WHAT_IF, Baseline, evaluate, format_scenarios, scenarios_from_text
+from ingest import parse_files, read_upload, split_batches, spool_to_path, unpack_uploads
+from agent import (
+    get_runner, chat_prefix, format_drift_for_ai, analyze_drift_parallel, analysis_cache,
+    stream_analysis, stream_tokens, complete,
+)
 from auth import (
-    hash_password, verify_password,
-    create_access_token, get_current_user,
+    warm_up as warm_up_auth, ahash_password, averify_password, hash_pool,
+    bearer_subject, create_access_token, get_current_user,
 )
-from database import init_db, get_user_by_email, create_user
+from database import init_db, close_db, get_user_by_email, create_user
+from cache import VersionedCache
+from store import DatasetStore, append_frames, combine_files
+from workspaces import workspaces
+from workers import parse_pool, pool
+from sessions import SessionStore
+from metrics import MetricsMiddleware, profiler, render, span
+
+# Background warm-up after startup: demo data, demo drift, auth and LLM
+# libraries. Without it each loads on first use.
+WARMUP = os.getenv("WARMUP", "1") == "1"
+
+startup_report = {"main_import_s": round(time.perf_counter() - _import_started, 3)}
 
 app = FastAPI(title="PayDrift API")
 
@@ -25,29 +59,237 @@ app.add_middleware(
     allow_origins=["*"],       # tighten in production
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id", "X-Profile-Id"],
 )
 
+# --- Request latency histograms + opt-in profiler (see metrics.py) ---
+# Only signed-in users' requests can be profiled
+app.add_middleware(MetricsMiddleware, authorize=bearer_subject)
+
 # --- In-memory store for uploaded data ---
-# Starts with demo data, gets replaced if user uploads CSVs
-datasets: dict[str, pd.DataFrame] = {}
+# Each user gets a workspace that starts as the shared demo data; their
+# uploads replace datasets in their own workspace only (see workspaces.py)
+
+# Drift results memoized per combination of dataset versions
+drift_cache = VersionedCache()
+
+# Chat prompt prefix (system prompt + formatted drift results), per dataset versions
+chat_prefix_cache = VersionedCache()
+
+# Serialized + compressed /api/drift bodies, per dataset versions and page
+drift_payload_cache = VersionedCache(maxsize=32)
+
+# Prefix-sum cubes for /api/drift/compare, one per (dataset, version)
+cube_cache = VersionedCache(maxsize=32)
+
+# Per-employee anomaly signals, one table per payroll version
+anomaly_cache = VersionedCache(maxsize=16)
+
+# Per-service seat utilization, one table per saas_cloud version
+utilization_cache = VersionedCache(maxsize=16)
+
+# Run-rate baselines for /api/scenarios and what-if chat questions
+scenario_cache = VersionedCache(maxsize=16)
+
+# Server-side chat conversations
+chat_sessions = SessionStore()
+
+
+async def get_drift_data(datasets: DatasetStore) -> dict:
+    """analyze_all() for a workspace, computed once per dataset version on the worker pool."""
+    snapshot = datasets.snapshot()
+    key = ("drift", datasets.version_key())
+    totals = datasets.totals_snapshot()
+    return await drift_cache.aget_or_compute(key, lambda: pool.run(analyze_all, snapshot, totals))
+
+
+async def get_chat_prefix(datasets: DatasetStore) -> str:
+    """
+    System prompt + formatted drift results for a workspace's chat turns,
+    built once per dataset version instead of on every turn.
+    """
+    key = ("chat_prefix", datasets.version_key())
+    # get_drift_data() snapshots the datasets before it first awaits, so its result matches `key`
+    drift_data = await get_drift_data(datasets)
+
+    async def build():
+        return chat_prefix(await format_drift_for_ai(drift_data))
+
+    return await chat_prefix_cache.aget_or_compute(key, build)
+
+
+async def get_cubes(datasets: DatasetStore) -> dict[str, DriftCube]:
+    """DriftCube per dataset, built once per dataset version on the worker pool."""
+    # Read every dataset before the first await, so a bulk upload landing
+    # meanwhile can't mix old and new datasets
+    versions = datasets.all_versions()
+    inputs = {name: (datasets[name], datasets.get_totals(name)) for name in DRIFT_COLUMNS}
+    cubes = {}
+    for name, (df, totals) in inputs.items():
+        cubes[name] = await cube_cache.aget_or_compute(
+            ("cube", name, versions[name]),
+            lambda: pool.run(DriftCube.from_frame, df, totals, name),
+        )
+    return cubes
+
+
+async def get_utilization(datasets: DatasetStore):
+    """service_utilization() of the workspace's saas_cloud data, computed once per version."""
+    saas = datasets["saas_cloud"]
+    key = ("utilization", datasets.all_versions()["saas_cloud"])
+    return await utilization_cache.aget_or_compute(key, lambda: pool.run(service_utilization, saas))
+
+
+async def get_baseline(datasets: DatasetStore) -> Baseline:
+    """Scenario baseline for a workspace, built once per combination of dataset versions."""
+    key = ("baseline", datasets.version_key())
+    cubes = await get_cubes(datasets)
+    return await scenario_cache.aget_or_compute(key, lambda: pool.run(Baseline, cubes))
+
+
+async def what_if_figures(message: str, datasets: DatasetStore) -> str:
+    """
+    Exact scenario-engine figures for a "what if we cut X by Y%" chat
+    message, so the model cites them instead of estimating; "" otherwise.
+    If X is ambiguous, every reading is included and the model is told so.
+    """
+    if not WHAT_IF.search(message):
+        return ""
+    baseline = await get_baseline(datasets)
+    scenarios = scenarios_from_text(message, baseline)
+    if not scenarios:
+        return ""
+    try:
+        result = await pool.run(evaluate, baseline, scenarios)
+    except ValueError:
+        return ""
+    if len(scenarios) == 1:
+        return f"{format_scenarios(result)}\nUse these exact figures for this what-if."
+    return (f"{format_scenarios(result)}\nThe question matches more than one item, so each reading "
+            f"is listed. Say which one each figure assumes and ask which was meant.")
+
+
+async def warm_up():
+    """Load what the first requests would otherwise wait for, one step at a time."""
+    steps = {
+        "demo_data": workspaces.ensure_demo,
+        "demo_drift": lambda: get_drift_data(workspaces.demo),
+        "demo_utilization": lambda: get_utilization(workspaces.demo),
+        "auth": lambda: run_in_threadpool(warm_up_auth),
+        "llm_client": lambda: run_in_threadpool(get_runner),
+    }
+    timings = startup_report["warmup_s"] = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e}")
+        timings[name] = round(time.perf_counter() - start, 3)
+    demo = workspaces.demo
+    print(f"Warm-up done in {sum(timings.values()):.2f}s; demo data: "
+          + ", ".join(f"{name} {len(demo[name])} rows" for name in demo.keys()))
 
 
 @app.on_event("startup")
 async def startup():
-    """Initialize database and load demo data when the server starts."""
+    """
+    Initialize the database. Demo data, the auth libraries and the LLM
+    client load on first use, or in the background when WARMUP=1, so the
+    server answers /health as soon as possible.
+    """
+    started = time.perf_counter()
     await init_db()
-    global datasets
-    datasets = load_all()
-    print(f"Loaded demo data:")
-    print(f"  payroll:    {len(datasets['payroll'])} rows")
-    print(f"  ai_costs:   {len(datasets['ai_costs'])} rows")
-    print(f"  saas_cloud: {len(datasets['saas_cloud'])} rows")
+    workspaces.load_index()
+    if WARMUP:
+        app.state.warmup = asyncio.create_task(warm_up())
+    startup_report["startup_s"] = round(time.perf_counter() - started, 3)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is not None:
+        warmup.cancel()
+    pool.shutdown()
+    parse_pool.shutdown()
+    hash_pool.shutdown()
+    await close_db()
 
 
 # --- Health check ---
+# Public, so it only says the server is up; the details are on /api/stats
 @app.get("/health")
 def health():
-    return {"status": "ok", "datasets_loaded": list(datasets.keys())}
+    # Seconds from main's import to the first health check served
+    startup_report.setdefault("first_health_s", round(time.perf_counter() - _import_started, 3))
+    return {"status": "ok"}
+
+
+# --- GET /api/stats ---
+# Startup report and worker, cache, workspace and session stats (signed-in users)
+@app.get("/api/stats")
+def server_stats(user: dict = Depends(get_current_user)):
+    return {
+        "datasets_loaded": list(workspaces.demo.keys()),
+        "startup": startup_report,
+        "workspaces": workspaces.stats(),
+        "drift_cache": drift_cache.stats(),
+        "chat_prefix_cache": chat_prefix_cache.stats(),
+        "drift_payload_cache": drift_payload_cache.stats(),
+        "scenario_cache": scenario_cache.stats(),
+        "utilization_cache": utilization_cache.stats(),
+        "workers": pool.stats(),
+        "parse_pool": parse_pool.stats(),
+        "auth_hash_pool": hash_pool.stats(),
+        "agent_cache": analysis_cache.stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "profiler": profiler.stats(user["email"]),
+    }
+
+
+# --- GET /metrics ---
+# Prometheus text format: request/stage latency histograms plus gauges
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    demo = workspaces.demo
+    ws = workspaces.stats()
+    workers = pool.stats()
+    gauges = {
+        "paydrift_dataset_rows": (
+            "Rows per demo dataset.",
+            [({"dataset": name}, len(demo[name])) for name in demo.keys()],
+        ),
+        "paydrift_dataset_memory_bytes": (
+            "Memory held by each demo dataset.",
+            [({"dataset": name}, b) for name, b in demo.memory_usage().items()],
+        ),
+        "paydrift_workspace_memory_bytes": ("Memory held by uploaded data in all workspaces.", [({}, ws["memory_bytes"])]),
+        "paydrift_workspace_memory_budget_bytes": ("WORKSPACE_MEMORY_MB in bytes.", [({}, ws["budget_bytes"])]),
+        "paydrift_workspaces_loaded": ("Workspaces held in memory.", [({}, ws["loaded"])]),
+        "paydrift_worker_pending": ("Jobs queued or running on the worker pool.", [({}, workers["pending"])]),
+        "paydrift_worker_rejected": ("Jobs rejected with 429 since startup.", [({}, workers["rejected"])]),
+        "paydrift_cache_hits": (
+            "Cache hits since startup.",
+            [({"cache": "drift"}, drift_cache.hits), ({"cache": "agent"}, analysis_cache.hits)],
+        ),
+        "paydrift_cache_misses": (
+            "Cache misses since startup.",
+            [({"cache": "drift"}, drift_cache.misses), ({"cache": "agent"}, analysis_cache.misses)],
+        ),
+        "paydrift_chat_sessions": ("Live chat sessions.", [({}, chat_sessions.stats()["sessions"])]),
+    }
+    return PlainTextResponse(render(gauges), media_type="text/plain; version=0.0.4")
+
+
+# --- GET /metrics/profiles/{profile_id} ---
+# Collapsed stacks of a request sent with `X-Profile: 1` (PROFILER_ENABLED=1)
+@app.get("/metrics/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str, user: dict = Depends(get_current_user)):
+    stacks = profiler.collapsed(profile_id, user["email"])
+    if stacks is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return stacks
 
 
 # --- POST /api/register ---
@@ -56,7 +298,7 @@ async def register(body: UserRegister):
     existing = await get_user_by_email(body.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
-    await create_user(body.email, body.name, hash_password(body.password))
+    await create_user(body.email, body.name, await ahash_password(body.password))
     token = create_access_token({"sub": body.email})
     return TokenResponse(access_token=token, name=body.name, email=body.email)
 
@@ -65,7 +307,7 @@ async def register(body: UserRegister):
 @app.post("/api/login", response_model=TokenResponse)
 async def login(body: UserLogin):
     user = await get_user_by_email(body.email)
-    if not user or not verify_password(body.password, user["hashed_password"]):
+    if not user or not await averify_password(body.password, user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     token = create_access_token({"sub": body.email})
     return TokenResponse(access_token=token, name=user["name"], email=user["email"])
@@ -78,20 +320,140 @@ def me(user: dict = Depends(get_current_user)):
 
 
 # --- GET /api/drift ---
-# Returns drift calculations for all 3 datasets
+# Returns drift calculations for all 3 datasets.
+# The body is encoded once per dataset version and served with an ETag
+# (If-None-Match -> 304) and gzip/brotli. ?items_limit=&items_offset=
+# pages each category's items.
 @app.get("/api/drift")
-def get_drift(user: dict = Depends(get_current_user)):
+async def get_drift(
+    request: Request,
+    items_limit: int | None = Query(None, ge=0),
+    items_offset: int = Query(0, ge=0),
+    user: dict = Depends(get_current_user),
+):
+    datasets = await workspaces.get(user["email"])
     if not datasets:
         raise HTTPException(status_code=500, detail="Demo data not loaded")
-    return analyze_all(datasets)
+
+    async def encode():
+        drift_data = page_items(await get_drift_data(datasets), items_limit, items_offset)
+        return await pool.run(EncodedPayload, drift_data)
+
+    key = ("drift", datasets.version_key(), items_limit, items_offset)
+    payload = await drift_payload_cache.aget_or_compute(key, encode)
+    return payload_response(request, payload)
+
+
+# --- GET /api/drift/compare ---
+# Drift between any two month windows (YYYY-MM, inclusive), optionally
+# regrouped, e.g. ?to=2025-06 (vs the month before) or
+# ?from=2025-01&to=2025-03&baseline_from=2024-01&baseline_to=2024-03&group_by=department
+@app.get("/api/drift/compare", response_model=CompareResponse)
+async def compare_drift(
+    from_: str | None = Query(None, alias="from"),
+    to: str | None = None,
+    baseline_from: str | None = None,
+    baseline_to: str | None = None,
+    group_by: str | None = None,   # comma-separated, e.g. "department" or "team,service"
+    user: dict = Depends(get_current_user),
+):
+    datasets = await workspaces.get(user["email"])
+    if not datasets:
+        raise HTTPException(status_code=500, detail="Demo data not loaded")
+
+    cubes = await get_cubes(datasets)
+    columns = [c.strip() for c in group_by.split(",") if c.strip()] if group_by else None
+    if columns and not any(set(columns) <= set(cube.group_cols) for cube in cubes.values()):
+        groupable = sorted({c for cube in cubes.values() for c in cube.group_cols})
+        raise HTTPException(status_code=400, detail=f"group_by must use columns from: {groupable}")
+
+    months = cubes["payroll"].months
+    for cube in cubes.values():
+        months = months.union(cube.months)
+    try:
+        window, baseline = resolve_windows(months, from_, to, baseline_from, baseline_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return compare_all(cubes, window, baseline, columns)
+
+
+# --- GET /api/anomalies ---
+# Employees whose pay or overtime stands out: out-of-band salaries, salary
+# creep, raise jumps, chronic overtime. Ranked by `signal`, top_k returned.
+@app.get("/api/anomalies", response_model=AnomalyResponse)
+async def get_anomalies(
+    top_k: int = Query(20, ge=1, le=1000),
+    signal: str = "score",
+    user: dict = Depends(get_current_user),
+):
+    if signal not in SIGNALS:
+        raise HTTPException(status_code=400, detail=f"signal must be one of: {SIGNALS}")
+    datasets = await workspaces.get(user["email"])
+    if "payroll" not in datasets:
+        raise HTTPException(status_code=500, detail="No payroll data loaded")
+
+    payroll = datasets["payroll"]
+    missing = {"employee_id", "band", "base_salary", "overtime"} - set(payroll.columns)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Payroll data is missing columns: {sorted(missing)}")
+
+    key = ("anomalies", datasets.all_versions()["payroll"])
+    signals = await anomaly_cache.aget_or_compute(key, lambda: pool.run(employee_signals, payroll))
+    return {"signal": signal, "employees": len(signals), "items": top_offenders(signals, top_k, signal)}
+
+
+# --- GET /api/utilization ---
+# SaaS services ranked by wasted seats over the full billing history:
+# idle-seat cost, utilization and sustained under-utilization streaks.
+# ?sort=idle_cost|idle_cost_total|current_streak|utilization, paged with top_k/offset.
+@app.get("/api/utilization", response_model=UtilizationResponse)
+async def get_utilization_ranking(
+    sort: str = "idle_cost",
+    top_k: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    user: dict = Depends(get_current_user),
+):
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {SORTS}")
+    datasets = await workspaces.get(user["email"])
+    if "saas_cloud" not in datasets:
+        raise HTTPException(status_code=500, detail="No SaaS/cloud data loaded")
+
+    saas = datasets["saas_cloud"]
+    missing = {"service", "month", "total_seats", "active_seats", "monthly_cost"} - set(saas.columns)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"SaaS/cloud data is missing columns: {sorted(missing)}")
+
+    table = await get_utilization(datasets)
+    return rank_services(table, sort, top_k, offset)
+
+
+# --- POST /api/scenarios ---
+# What-if projections: each scenario is a batch of percent or $ adjustments
+# (by category/department/team/service, from a start month) applied to the
+# current run rate. All scenarios are evaluated together in one pass.
+@app.post("/api/scenarios", response_model=ScenarioResponse)
+async def run_scenarios(req: ScenarioRequest, user: dict = Depends(get_current_user)):
+    datasets = await workspaces.get(user["email"])
+    if not datasets:
+        raise HTTPException(status_code=500, detail="No data loaded")
+
+    baseline = await get_baseline(datasets)
+    scenarios = [s.model_dump() for s in req.scenarios]
+    try:
+        return await pool.run(evaluate, baseline, scenarios, req.horizon)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # --- POST /api/upload ---
-# Accepts a CSV file, parses it, stores in memory
+# Accepts a CSV file, parses it in chunks, stores in memory.
+# mode=append merges the rows (e.g. a new month) into the stored dataset.
 @app.post("/api/upload", response_model=UploadResponse)
 async def upload_csv(
     file: UploadFile = File(...),
     dataset_type: str = "payroll",  # "payroll" | "ai_costs" | "saas_cloud"
+    mode: str = "replace",          # "replace" | "append"
     user: dict = Depends(get_current_user),
 ):
     # Validate dataset type
@@ -102,6 +464,9 @@ async def upload_csv(
             detail=f"dataset_type must be one of: {valid_types}"
         )
 
+    if mode not in ("replace", "append"):
+        raise HTTPException(status_code=400, detail="mode must be 'replace' or 'append'")
+
     # Validate file type
     if not file.filename.endswith((".csv", ".xlsx", ".xls")):
         raise HTTPException(
@@ -109,28 +474,39 @@ async def upload_csv(
             detail="File must be .csv, .xlsx, or .xls"
         )
 
-    # Read file contents
-    contents = await file.read()
-
-    # Parse based on file type
+    # Parse on the worker pool, streaming chunks off the spooled upload file.
+    # Worker processes can't share the file object, so they get a temp path.
+    source = file.file
+    if pool.mode == "process":
+        source = await run_in_threadpool(spool_to_path, file.file, file.filename)
     try:
-        if file.filename.endswith(".csv"):
-            df = pd.read_csv(BytesIO(contents))
-        else:
-            df = pd.read_excel(BytesIO(contents))
+        with span("upload.parse"):
+            df = await pool.run(read_upload, source, file.filename, dataset_type)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to parse file: {str(e)}")
-
-    # Clean column names
-    df.columns = df.columns.str.strip()
-
-    # Try to parse month column if it exists
-    if "month" in df.columns:
-        df["month"] = pd.to_datetime(df["month"])
-
-    # Store in memory (replaces demo data for this type)
-    datasets[dataset_type] = df
-    print(f"Uploaded {file.filename} as {dataset_type}: {len(df)} rows")
+    finally:
+        if isinstance(source, str):
+            os.unlink(source)
+
+    async with workspaces.pinned(user["email"]) as datasets:
+        if mode == "append" and dataset_type in datasets:
+            async with workspaces.append_lock(user["email"]):
+                try:
+                    merged, totals = await pool.run(
+                        append_frames, datasets[dataset_type],
+                        datasets.get_totals(dataset_type), df, dataset_type,
+                    )
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                datasets.put(dataset_type, merged, totals)
+            print(f"Appended {file.filename} to {dataset_type}: {len(df)} rows ({len(merged)} total)")
+        else:
+            # Store in this user's workspace (replaces demo data for this type).
+            # read_upload() already compacted it on the pool, so put() as-is.
+            datasets.put(dataset_type, df)
+            print(f"Uploaded {file.filename} as {dataset_type}: {len(df)} rows")
 
     return UploadResponse(
         filename=file.filename,
@@ -140,37 +516,201 @@ async def upload_csv(
     )
 
 
+# --- POST /api/upload/bulk ---
+# Several .csv/.xlsx/.xls files and/or .zip archives of them in one request,
+# e.g. a zip of monthly files per dataset. Each file's dataset comes from
+# its name or folder (payroll/2025-01.csv) or else its columns. Files are
+# parsed in parallel on the parse process pool, combined per dataset and checked
+# against its schema, then every dataset is published in one step.
+@app.post("/api/upload/bulk", response_model=BulkUploadResponse)
+async def upload_bulk(
+    files: list[UploadFile] = File(...),
+    mode: str = "replace",          # "replace" | "append"
+    user: dict = Depends(get_current_user),
+):
+    if mode not in ("replace", "append"):
+        raise HTTPException(status_code=400, detail="mode must be 'replace' or 'append'")
+
+    workdir = tempfile.mkdtemp(prefix="paydrift-bulk-")
+    try:
+        try:
+            entries = await run_in_threadpool(unpack_uploads, [(f.file, f.filename) for f in files], workdir)
+        except (ValueError, zipfile.BadZipFile) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not entries:
+            raise HTTPException(status_code=400, detail="No .csv, .xlsx or .xls files in the upload")
+
+        # One job per parse process, each parsing a share of the files
+        batches = split_batches(entries, parse_pool.workers)
+        with span("upload.bulk_parse"):
+            results = await asyncio.gather(*(parse_pool.run(parse_files, b) for b in batches),
+                                           return_exceptions=True)
+    finally:
+        await run_in_threadpool(shutil.rmtree, workdir, True)
+
+    for result in results:
+        if isinstance(result, HTTPException):
+            raise result
+        if isinstance(result, Exception):
+            raise HTTPException(status_code=400, detail=str(result))
+    parts: dict[str, list] = {}
+    for name, dataset_type, df in (item for batch in results for item in batch):
+        parts.setdefault(dataset_type, []).append((name, df))
+
+    try:
+        with span("upload.bulk_combine"):
+            combined = dict(zip(parts, await asyncio.gather(
+                *(pool.run(combine_files, p, dataset_type) for dataset_type, p in parts.items())
+            )))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async with workspaces.pinned(user["email"]) as datasets:
+        if mode == "append":
+            async with workspaces.append_lock(user["email"]):
+                updates = {}
+                for dataset_type, df in combined.items():
+                    if dataset_type not in datasets:
+                        updates[dataset_type] = (df, None)
+                        continue
+                    try:
+                        updates[dataset_type] = await pool.run(
+                            append_frames, datasets[dataset_type],
+                            datasets.get_totals(dataset_type), df, dataset_type,
+                        )
+                    except ValueError as e:
+                        raise HTTPException(status_code=400, detail=str(e))
+                datasets.put_many(updates)
+        else:
+            datasets.put_many({dataset_type: (df, None) for dataset_type, df in combined.items()})
+        stored = {dataset_type: len(datasets[dataset_type]) for dataset_type in combined}
+
+    summary = []
+    for dataset_type, df in combined.items():
+        months = df["month"]
+        summary.append({
+            "dataset_type": dataset_type,
+            "files": sorted(name for name, _ in parts[dataset_type]),
+            "rows": len(df),
+            "total_rows": stored[dataset_type],
+            "first_month": str(months.min()),
+            "last_month": str(months.max()),
+        })
+    print(f"Bulk {mode} of {len(entries)} files: "
+          + ", ".join(f"{d['dataset_type']} {d['rows']} rows" for d in summary))
+    return {"mode": mode, "files": len(entries), "workers": len(batches), "datasets": summary}
+
+
 # --- POST /api/reset ---
 # Reset to demo data (useful after uploading custom data)
 @app.post("/api/reset")
-def reset_data(user: dict = Depends(get_current_user)):
-    global datasets
-    datasets = load_all()
+async def reset_data(user: dict = Depends(get_current_user)):
+    await workspaces.reset(user["email"])
     return {"status": "reset to demo data"}
 
 
 
 # --- POST /api/analyze ---
-# AI analyzes all drift data and returns insights + recommendations
+# AI analyzes all drift data and returns insights + recommendations.
+# Categories are analyzed concurrently; `partial` is true if any of them
+# (or the final ranking) timed out, in which case the rest is still returned.
 @app.post("/api/analyze")
 async def analyze(user: dict = Depends(get_current_user)):
+    datasets = await workspaces.get(user["email"])
     if not datasets:
         raise HTTPException(status_code=500, detail="No data loaded")
 
-    drift_data = analyze_all(datasets)
-    summary = await format_drift_for_ai(drift_data)
-    analysis = await analyze_drift(summary)
-    return {"analysis": analysis}
+    drift_data = await get_drift_data(datasets)
+    try:
+        return await analyze_drift_parallel(drift_data)
+    except RuntimeError as e:
+        raise HTTPException(status_code=504, detail=str(e))
 
 
 # --- POST /api/chat ---
-# AI answers follow-up questions with drift data context
-@app.post("/api/chat")
+# AI answers follow-up questions with drift data context.
+# Pass back the returned session_id to continue the conversation server-side.
+@app.post("/api/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest, user: dict = Depends(get_current_user)):
+    datasets = await workspaces.get(user["email"])
+    if not datasets:
+        raise HTTPException(status_code=500, detail="No data loaded")
+
+    session = chat_sessions.get_or_create(user["email"], req.session_id, req.history)
+    prefix = await get_chat_prefix(datasets)
+    figures = await what_if_figures(req.message, datasets)
+    message = f"{req.message}\n\n{figures}" if figures else req.message
+    response = await complete(session.build_prompt(message, prefix))
+    session.record(req.message, response)
+    return ChatResponse(response=response, session_id=session.id)
+
+
+# --- GET /api/chat/sessions/{session_id} ---
+# Prompt-size metrics for one chat session
+@app.get("/api/chat/sessions/{session_id}")
+def chat_session_metrics(session_id: str, user: dict = Depends(get_current_user)):
+    return chat_sessions.get(user["email"], session_id).metrics()
+
+# --- Server-Sent Events helpers ---
+def sse_response(chunks, headers: dict | None = None) -> StreamingResponse:
+    """
+    Stream text chunks as SSE: one `data: {"delta": ...}` event per chunk,
+    then `event: done`. If the client disconnects, Starlette cancels the
+    generator, which closes the upstream model stream.
+    """
+    async def events():
+        # aclosing: when this generator is closed early, close `chunks` too
+        async with aclosing(chunks):
+            try:
+                async for text in chunks:
+                    yield f"data: {json.dumps({'delta': text})}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+                return
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **(headers or {})},
+    )
+
+
+# --- POST /api/analyze/stream ---
+# Same analysis as /api/analyze, streamed as SSE: the heading, then each
+# category's section as soon as it (and the ones before it) is done, then
+# the recommendations
+@app.post("/api/analyze/stream")
+async def analyze_stream(user: dict = Depends(get_current_user)):
+    datasets = await workspaces.get(user["email"])
+    if not datasets:
+        raise HTTPException(status_code=500, detail="No data loaded")
+
+    drift_data = await get_drift_data(datasets)
+    return sse_response(stream_analysis(drift_data))
+
+
+# --- POST /api/chat/stream ---
+# Same as /api/chat, but streams the answer as it is generated.
+# The session id comes back in the X-Session-Id header.
+@app.post("/api/chat/stream")
+async def chat_stream(req: ChatRequest, user: dict = Depends(get_current_user)):
+    datasets = await workspaces.get(user["email"])
     if not datasets:
         raise HTTPException(status_code=500, detail="No data loaded")
 
-    drift_data = analyze_all(datasets)
-    summary = await format_drift_for_ai(drift_data)
-    response = await chat_with_agent(req.message, req.history, summary)
-    return {"response": response}
\ No newline at end of file
+    session = chat_sessions.get_or_create(user["email"], req.session_id, req.history)
+    prefix = await get_chat_prefix(datasets)
+    figures = await what_if_figures(req.message, datasets)
+    message = f"{req.message}\n\n{figures}" if figures else req.message
+    prompt = session.build_prompt(message, prefix)
+
+    async def chunks():
+        parts = []
+        async with aclosing(stream_tokens(prompt)) as tokens:
+            async for text in tokens:
+                parts.append(text)
+                yield text
+        session.record(req.message, "".join(parts))
+
+    return sse_response(chunks(), headers={"X-Session-Id": session.id})
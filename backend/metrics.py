@@ -0,0 +1,246 @@
+"""
+In-process performance metrics, exposed in Prometheus text format by
+GET /metrics:
+
+    paydrift_request_duration_seconds  histogram per method, route, status
+    paydrift_stage_duration_seconds    histogram per named span (span("..."))
+    gauges                             collected at scrape time (rows, bytes, ...)
+
+Spans recorded inside worker processes (WORKER_MODE=process) stay in that
+process and don't show up here; thread mode records everything.
+
+The sampling profiler is opt-in (PROFILER_ENABLED=1): an authenticated
+request sent with `X-Profile: 1` is sampled every PROFILER_INTERVAL_MS and
+the user who sent it can fetch the collapsed stacks from
+/metrics/profiles/{id} (flamegraph.pl/speedscope format).
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+
+# --- Config ---
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED") == "1"
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILES_KEPT = 8
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by a fixed tuple of label values."""
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._counts: dict[tuple, list[int]] = defaultdict(lambda: [0] * len(buckets))
+        self._sum: dict[tuple, float] = defaultdict(float)
+        self._total: dict[tuple, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values):
+        with self._lock:
+            counts = self._counts[label_values]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            self._sum[label_values] += seconds
+            self._total[label_values] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key in sorted(self._total):
+                for bound, count in zip(self.buckets, self._counts[key]):
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {self._total[key]}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {self._sum[key]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {self._total[key]}")
+        return lines
+
+
+request_latency = Histogram(
+    "paydrift_request_duration_seconds", "HTTP request latency by route.",
+    labels=("method", "route", "status"),
+)
+stage_latency = Histogram(
+    "paydrift_stage_duration_seconds", "Time spent in named stages of request handling.",
+    labels=("stage",),
+)
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block into paydrift_stage_duration_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_latency.observe(time.perf_counter() - start, stage)
+
+
+def render(gauges: dict[str, tuple[str, list[tuple[dict, float]]]]) -> str:
+    """
+    Prometheus text exposition of the histograms plus `gauges`, given as
+    {metric_name: (help, [(labels_dict, value), ...])}.
+    """
+    lines = request_latency.render() + stage_latency.render()
+    for name, (help, samples) in gauges.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template (so
+    /api/chat/sessions/{session_id} is one series), and running the
+    profiler for requests that ask for it. Streaming responses are timed
+    until their last body chunk.
+
+    `authorize(headers)` returns who is asking (or None); only requests
+    it accepts are profiled, and the profile belongs to that caller.
+    """
+
+    def __init__(self, app, authorize=lambda headers: None):
+        self.app = app
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        profile_id = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile_id is not None:
+                    message["headers"] = [*message.get("headers", []),
+                                          (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        headers = scope.get("headers", [])
+        owner = self.authorize(headers) if PROFILER_ENABLED and (b"x-profile", b"1") in headers else None
+        start = time.perf_counter()
+        try:
+            if owner is not None:
+                with profiler.capture(f"{scope['method']} {scope['path']}", owner) as profile_id:
+                    await self.app(scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            request_latency.observe(
+                time.perf_counter() - start, scope["method"],
+                getattr(route, "path", "unmatched"), status,
+            )
+
+
+# --- Sampling profiler ---
+class SamplingProfiler:
+    """
+    Samples every thread's Python stack at a fixed interval from a background
+    thread and counts identical stacks. Only one capture runs at a time; a
+    request that asks for a profile while another is running isn't profiled.
+    Stacks from the event loop thread include any other request it served
+    meanwhile.
+    """
+
+    def __init__(self, interval_ms: float = PROFILER_INTERVAL_MS, kept: int = PROFILES_KEPT):
+        self.interval = interval_ms / 1000
+        self.kept = kept
+        self.profiles: OrderedDict[str, dict] = OrderedDict()
+        self._busy = threading.Lock()
+        self._ids = itertools.count(1)
+
+    @contextmanager
+    def capture(self, label: str, owner: str):
+        """Profile the enclosed block for `owner`; yields the profile id, or None if busy."""
+        if not self._busy.acquire(blocking=False):
+            yield None
+            return
+
+        profile_id = f"{int(time.time())}-{next(self._ids)}"
+        stacks: Counter = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(stacks, stop), daemon=True)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            yield profile_id
+        finally:
+            stop.set()
+            sampler.join()
+            self._busy.release()
+            self.profiles[profile_id] = {
+                "owner": owner,
+                "label": label,
+                "duration_s": round(time.perf_counter() - start, 4),
+                "interval_ms": self.interval * 1000,
+                "stacks": stacks,
+            }
+            while len(self.profiles) > self.kept:
+                self.profiles.popitem(last=False)
+
+    def _sample(self, stacks: Counter, stop: threading.Event):
+        me = threading.get_ident()
+        names = {}
+        while not stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident not in names:
+                    names.update((t.ident, t.name) for t in threading.enumerate())
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stacks[";".join([names.get(ident, str(ident)), *reversed(frames)])] += 1
+
+    def collapsed(self, profile_id: str, owner: str) -> str | None:
+        """
+        Collapsed-stack text ("frame;frame;frame count" per line), hottest
+        first, or None unless the profile exists and belongs to `owner`.
+        """
+        profile = self.profiles.get(profile_id)
+        if profile is None or profile["owner"] != owner:
+            return None
+        return "\n".join(f"{stack} {n}" for stack, n in profile["stacks"].most_common()) + "\n"
+
+    def stats(self, owner: str) -> dict:
+        return {
+            "enabled": PROFILER_ENABLED,
+            "profiles": [
+                {"id": pid, "label": p["label"], "duration_s": p["duration_s"],
+                 "samples": sum(p["stacks"].values())}
+                for pid, p in self.profiles.items() if p["owner"] == owner
+            ],
+        }
+
+
+profiler = SamplingProfiler()
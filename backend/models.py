@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 # --- Individual drift item (one row in the breakdown table) ---
@@ -38,6 +38,123 @@ class DriftResponse(BaseModel):
     monthly_trends: list[TrendPoint]
 
 
+# --- Month-range comparison (GET /api/drift/compare) ---
+class CompareResponse(BaseModel):
+    from_: str = Field(alias="from")   # window compared, "YYYY-MM" inclusive
+    to: str
+    baseline_from: str                 # window it is compared against
+    baseline_to: str
+    group_by: list[str] | None         # None = each dataset's default grouping
+    total_drift: float
+    categories: list[DriftSummary]     # avg_before = baseline, avg_after = window
+
+
+# --- Employee-level payroll anomalies (GET /api/anomalies) ---
+class AnomalyItem(BaseModel):
+    employee_id: str
+    name: str
+    department: str
+    role: str
+    band: str
+    type: str                # "FTE" | "Contractor"
+    latest_month: str        # last month the employee appears in
+    latest_base: float       # base salary in latest_month
+    band_mean: float         # mean latest base of peers (same band + type)
+    band_z: float            # z-score vs those peers
+    salary_slope_pct: float  # base salary trend, % per year
+    max_jump_pct: float      # largest month-over-month base increase
+    max_jump_month: str
+    overtime_pct: float      # overtime as % of base, last 3 months
+    heavy_ot_pct: float      # % of months with overtime > 10% of base
+    score: float             # largest z-score across the signals
+    reasons: list[str]       # "out_of_band" | "salary_creep" | "raise_jump" | "chronic_overtime" | "contractor_rate_bump"
+
+
+class AnomalyResponse(BaseModel):
+    signal: str              # what items are ranked by
+    employees: int           # employees scanned
+    items: list[AnomalyItem]
+
+
+# --- SaaS seat utilization (GET /api/utilization) ---
+class UtilizationItem(BaseModel):
+    service: str
+    category: str
+    latest_month: str            # last month with seat counts
+    total_seats: float           # in latest_month
+    active_seats: float
+    monthly_cost: float
+    utilization_pct: float       # active / total seats in latest_month
+    avg_utilization_pct: float   # over the whole history
+    idle_cost: float             # monthly_cost x (1 - active / total) in latest_month
+    idle_cost_annualized: float  # idle_cost * 12
+    idle_cost_total: float       # idle cost summed over the whole history
+    current_streak: int          # months with seat data in a row under the threshold, up to latest_month
+    longest_streak: int
+    months: int                  # months with seat counts
+    flagged: bool                # under the threshold in latest_month
+    sustained: bool              # current_streak of 3+ months
+
+
+class UtilizationResponse(BaseModel):
+    sort: str                    # what items are ranked by
+    threshold_pct: float         # under-utilized below this % of seats active
+    services: int                # seat-based services scanned
+    flagged: int
+    sustained: int
+    idle_cost_monthly: float     # across all services, latest month
+    idle_cost_annualized: float
+    items: list[UtilizationItem]
+
+
+# --- What-if scenarios (POST /api/scenarios) ---
+class Adjustment(BaseModel):
+    category: str | None = None     # "people" | "ai_llm" | "saas_cloud"; filters below narrow it
+    department: str | None = None   # matched case-insensitively
+    team: str | None = None
+    service: str | None = None
+    kind: str = "percent"           # "percent" | "absolute"
+    value: float                    # percent: -30 = cut 30%; absolute: $/mo change (negative = saving)
+    start: str | None = None        # "YYYY-MM" it takes effect; default first projected month
+
+
+class Scenario(BaseModel):
+    name: str
+    adjustments: list[Adjustment]
+
+
+class ScenarioRequest(BaseModel):
+    scenarios: list[Scenario]
+    horizon: int = 12               # months projected after the latest month
+
+
+class ScenarioMonth(BaseModel):
+    month: str
+    people: float
+    ai_llm: float
+    saas_cloud: float
+    total: float
+
+
+class ScenarioResult(BaseModel):
+    name: str
+    monthly: list[ScenarioMonth]
+    monthly_total: float            # final projected month, all changes in effect
+    annualized: float               # monthly_total * 12
+    annual_change: float            # vs baseline; negative = savings
+    horizon_total: float            # sum over all projected months
+    categories: dict[str, float]    # annualized per category
+    matched_items: list[int] = []   # groups each adjustment applied to
+
+
+class ScenarioResponse(BaseModel):
+    run_rate_months: int            # baseline = average of this many latest months
+    projected_from: str
+    projected_to: str
+    baseline: ScenarioResult
+    scenarios: list[ScenarioResult]
+
+
 # --- Raw data response (Phase 1: before drift calc exists) ---
 class RawDataResponse(BaseModel):
     payroll_rows: int
@@ -55,10 +172,12 @@ class RawDataResponse(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     history: list[dict] = []       # previous messages: [{"role": "user", "content": "..."}, ...]
+    session_id: str | None = None  # server-side session; when set, `history` is ignored
 
 
 class ChatResponse(BaseModel):
     response: str
+    session_id: str
 
 
 # --- Upload response ---
@@ -69,6 +188,23 @@ class UploadResponse(BaseModel):
     sample: list[dict]             # first 5 rows preview
 
 
+# --- Bulk upload response (POST /api/upload/bulk) ---
+class BulkDataset(BaseModel):
+    dataset_type: str
+    files: list[str]               # file names (or paths inside the zip)
+    rows: int                      # rows uploaded
+    total_rows: int                # rows stored after the upload (differs in append mode)
+    first_month: str
+    last_month: str
+
+
+class BulkUploadResponse(BaseModel):
+    mode: str                      # "replace" | "append"
+    files: int
+    workers: int                   # parse jobs run in parallel
+    datasets: list[BulkDataset]
+
+
 # --- Auth models ---
 class UserRegister(BaseModel):
     email: str
@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+import json
+
+from fastapi import Request, Response
+
+from metrics import span
+
+try:
+    import orjson
+except ImportError:  # plain json works too, just slower
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+MIN_COMPRESS_BYTES = 1024   # smaller bodies aren't worth the encoding header
+
+
+def dumps(data) -> bytes:
+    """Compact UTF-8 JSON, as FastAPI's JSONResponse would render it."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class EncodedPayload:
+    """
+    A JSON body serialized once, with its compressed variants and strong
+    ETag, so repeat requests for the same data cost no encoding work.
+    """
+
+    def __init__(self, data):
+        with span("payload.encode"):
+            self.body = dumps(data)
+            self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+            self.encoded: dict[str, bytes] = {}
+            if len(self.body) >= MIN_COMPRESS_BYTES:
+                self.encoded["gzip"] = gzip.compress(self.body, GZIP_LEVEL, mtime=0)
+                if brotli is not None:
+                    self.encoded["br"] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+
+
+def _accepted(request: Request) -> set[str]:
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check; the -gzip/-br suffix of an encoded variant still matches."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag == "*" or tag.split("-")[0] == etag:
+            return True
+    return False
+
+
+def payload_response(request: Request, payload: EncodedPayload) -> Response:
+    """
+    Serve a pre-encoded payload: 304 when the client already has it,
+    otherwise brotli or gzip bytes if the client accepts them.
+    """
+    headers = {
+        "Vary": "Accept-Encoding, Authorization",
+        # Per-user data: browsers may keep it but must revalidate (cheap 304)
+        "Cache-Control": "private, no-cache",
+    }
+    accepted = _accepted(request)
+    encoding = next((e for e in ("br", "gzip") if e in payload.encoded and e in accepted), None)
+    headers["ETag"] = f'"{payload.etag}-{encoding}"' if encoding else f'"{payload.etag}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, payload.etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        return Response(payload.encoded[encoding], media_type="application/json", headers=headers)
+    return Response(payload.body, media_type="application/json", headers=headers)
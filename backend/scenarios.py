@@ -0,0 +1,275 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from cube import DriftCube, to_month
+from drift import CATEGORIES, round2, to_records
+from metrics import span
+
+# --- Config ---
+RUN_RATE_MONTHS = 3      # baseline = average monthly spend over the latest months (drift's "after" window)
+MAX_HORIZON = 60         # months a scenario can be projected
+MAX_SCENARIOS = 500      # scenarios per request
+TARGET_COLUMNS = ["department", "team", "service"]   # group columns an adjustment can filter on
+KINDS = ("percent", "absolute")
+
+CATEGORIES_BY_ID = {category: label for category, label in CATEGORIES.values()}
+
+
+class Baseline:
+    """
+    Current monthly run rate of every drift group across the datasets (one
+    row per group, e.g. "Engineering - FTE" or "Slack"), the starting point
+    that scenarios adjust. Rates are flat: the projection answers "what if
+    we changed X" against today's spend, not a trend forecast.
+    """
+
+    def __init__(self, cubes: dict[str, DriftCube], run_rate_months: int = RUN_RATE_MONTHS):
+        self.categories = [CATEGORIES[name][0] for name in cubes]
+        self.last_month = max(cube.months.max() for cube in cubes.values())
+
+        rates, cats, items = [], [], []
+        labels = {col: [] for col in TARGET_COLUMNS}
+        for c, cube in enumerate(cubes.values()):
+            end = cube.months.max()
+            sums, _ = cube.window(end - (run_rate_months - 1), end)
+            rates.append(sums / run_rate_months)
+            cats.append(np.full(len(sums), c))
+
+            groups = cube.groups.to_frame(index=False).astype(str)
+            items.append(groups.agg(" - ".join, axis=1).to_numpy(dtype=object))
+            for col in TARGET_COLUMNS:
+                labels[col].append(groups[col].to_numpy(dtype=object) if col in groups
+                                   else np.full(len(groups), None, dtype=object))
+
+        self.rate = np.concatenate(rates).astype("float64")
+        self.cat = np.concatenate(cats)
+        self.items = np.concatenate(items)
+        # Case-insensitive lookups: column -> (code per group, {casefolded label: code})
+        self._codes = {}
+        for col, parts in labels.items():
+            values = pd.Series(np.concatenate(parts)).str.casefold()
+            codes, uniques = pd.factorize(values)
+            self._codes[col] = (codes, {v: i for i, v in enumerate(uniques)})
+
+    def labels(self, col: str) -> list[str]:
+        """Distinct values of a target column (casefolded)."""
+        return list(self._codes[col][1])
+
+    def by_category(self, values: np.ndarray) -> np.ndarray:
+        """Sum per-group values (..., groups) into (..., categories)."""
+        onehot = np.zeros((len(self.cat), len(self.categories)))
+        onehot[np.arange(len(self.cat)), self.cat] = 1
+        return values @ onehot
+
+    def match(self, adjustments: list[dict]) -> np.ndarray:
+        """(adjustments, groups) mask of the groups each adjustment targets."""
+        mask = np.ones((len(adjustments), len(self.rate)), dtype=bool)
+        categories = [a.get("category") for a in adjustments]
+        if any(categories):
+            wanted = np.array([self.categories.index(c) if c in self.categories else -2 if c else -1
+                               for c in categories])
+            mask &= (wanted[:, None] == -1) | (wanted[:, None] == self.cat[None, :])
+        for col in TARGET_COLUMNS:
+            values = [a.get(col) for a in adjustments]
+            if not any(values):
+                continue
+            codes, lookup = self._codes[col]
+            wanted = np.array([lookup.get(str(v).casefold(), -2) if v else -1 for v in values])
+            mask &= (wanted[:, None] == -1) | (wanted[:, None] == codes[None, :])
+        return mask
+
+
+def _validate(scenarios: list[dict], horizon: int):
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"horizon must be between 1 and {MAX_HORIZON} months")
+    if not 1 <= len(scenarios) <= MAX_SCENARIOS:
+        raise ValueError(f"Send between 1 and {MAX_SCENARIOS} scenarios")
+    for s in scenarios:
+        for a in s["adjustments"]:
+            if a.get("kind", "percent") not in KINDS:
+                raise ValueError(f"Scenario {s['name']!r}: kind must be one of {list(KINDS)}")
+            if a.get("category") and a["category"] not in CATEGORIES_BY_ID:
+                raise ValueError(f"Scenario {s['name']!r}: category must be one of {list(CATEGORIES_BY_ID)}")
+
+
+@span("scenarios.evaluate")
+def evaluate(baseline: Baseline, scenarios: list[dict], horizon: int = 12) -> dict:
+    """
+    Project every scenario over the `horizon` months after the latest month,
+    all at once. Each scenario is a list of adjustments:
+
+      category / department / team / service   which groups it applies to (all given must match)
+      kind   "percent": value is a % change of those groups' spend (-30 = cut 30%)
+             "absolute": value is a $/month change, spread over those groups by spend
+      start  "YYYY-MM" the change takes effect (default: first projected month)
+
+    Adjustments are linear: two -30% cuts on the same groups are -60%, and
+    projected totals never go below zero. Raises ValueError for invalid
+    input or an adjustment that matches no groups.
+    """
+    _validate(scenarios, horizon)
+    months = pd.period_range(baseline.last_month + 1, periods=horizon, freq="M")
+    adjustments = [a for s in scenarios for a in s["adjustments"]]
+    owner = np.repeat(np.arange(len(scenarios)), [len(s["adjustments"]) for s in scenarios])
+
+    # --- Which groups, from which month (adjustments x groups, adjustments x months) ---
+    matched = baseline.match(adjustments)
+    counts = matched.sum(axis=1)
+    for i in np.flatnonzero(counts == 0):
+        raise ValueError(f"Scenario {scenarios[owner[i]]['name']!r}: adjustment "
+                         f"{i - np.flatnonzero(owner == owner[i])[0] + 1} matches no items")
+    start = np.array([(to_month(a["start"]) - months[0]).n if a.get("start") else 0 for a in adjustments])
+    active = np.arange(horizon)[None, :] >= np.maximum(start, 0)[:, None]
+
+    # --- Monthly change per adjustment and category, once in effect ---
+    matched_spend = baseline.by_category(matched * baseline.rate)   # (adjustments, categories)
+    value = np.array([float(a["value"]) for a in adjustments])
+    percent = np.array([a.get("kind", "percent") == "percent" for a in adjustments])
+    total = matched_spend.sum(axis=1, keepdims=True)
+    share = np.where(total > 0, matched_spend / np.where(total > 0, total, 1),
+                     baseline.by_category(matched.astype("float64")) / counts[:, None])
+    change = np.where(percent[:, None], matched_spend * value[:, None] / 100, share * value[:, None])
+
+    # --- Sum adjustments into their scenarios: (scenarios, categories, months) ---
+    per_adjustment = change[:, :, None] * active[:, None, :]
+    membership = np.zeros((len(scenarios), len(adjustments)))
+    membership[owner, np.arange(len(adjustments))] = 1
+    delta = np.tensordot(membership, per_adjustment, axes=1)
+    base = np.broadcast_to(baseline.by_category(baseline.rate)[:, None], delta.shape[1:])
+    projected = np.maximum(base + delta, 0)
+
+    labels = months.strftime("%Y-%m")
+    names = ["Baseline"] + [s["name"] for s in scenarios]
+    results = _results(names, baseline.categories, labels, np.concatenate([base[None], projected]))
+    for i, result in enumerate(results[1:]):
+        result["matched_items"] = counts[owner == i].tolist()
+    return {
+        "run_rate_months": RUN_RATE_MONTHS,
+        "projected_from": labels[0],
+        "projected_to": labels[-1],
+        "baseline": results[0],
+        "scenarios": results[1:],
+    }
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """round2() for arrays of any shape."""
+    return round2(values.ravel()).reshape(values.shape)
+
+
+def _results(names: list[str], categories: list[str], labels, projected: np.ndarray) -> list[dict]:
+    """
+    ScenarioResult dicts from a (scenarios, categories, months) projection
+    whose first scenario is the baseline. Rounded in one pass for all of them.
+    """
+    totals = projected.sum(axis=1)
+    # Annualized at the final month's run rate, when every change is in effect
+    annualized = projected[:, :, -1] * 12
+    annual_total = annualized.sum(axis=1)
+    monthly, total, annualized = _round2(projected), _round2(totals), _round2(annualized)
+    summary = _round2(np.column_stack([
+        totals[:, -1], annual_total, annual_total - annual_total[0], totals.sum(axis=1),
+    ])).tolist()
+
+    month_col = np.asarray(labels, dtype=object)
+    results = []
+    for i, name in enumerate(names):
+        columns = {"month": month_col, **dict(zip(categories, monthly[i])), "total": total[i]}
+        results.append({
+            "name": name,
+            "monthly": to_records(columns),
+            "monthly_total": summary[i][0],
+            "annualized": summary[i][1],
+            "annual_change": summary[i][2],
+            "horizon_total": summary[i][3],
+            "categories": dict(zip(categories, annualized[i].tolist())),
+        })
+    return results
+
+
+# --- What-if questions in chat ---
+# "What if we cut AI spend by 30%?", "reduce Slack by $500 from 2025-09"
+WHAT_IF = re.compile(
+    r"\b(?P<verb>cut|reduce|lower|trim|decrease|increase|raise|grow)\s+(?P<target>.+?)\s+by\s+"
+    r"(?P<dollar>\$)?(?P<amount>\d[\d,]*(?:\.\d+)?)\s*(?P<unit>%|percent)?"
+    r"(?:.*?\b(?:from|starting(?:\s+in)?)\s+(?P<start>\d{4}-\d{2}))?",
+    re.IGNORECASE,
+)
+CATEGORY_WORDS = {
+    "people": ["people", "payroll", "headcount", "salaries", "salary"],
+    "ai_llm": ["ai", "llm", "tokens", "models"],
+    "saas_cloud": ["saas", "cloud", "software", "subscriptions"],
+}
+# "Engineering team", "sales staff": people, so the payroll department
+HEADCOUNT_WORDS = {"team", "teams", "headcount", "staff", "employees", "people", "payroll"}
+COLUMN_CATEGORIES = {"department": {"people"}, "team": {"ai_llm"}, "service": {"ai_llm", "saas_cloud"}}
+DECREASE = {"cut", "reduce", "lower", "trim", "decrease"}
+
+
+def scenarios_from_text(message: str, baseline: Baseline) -> list[dict]:
+    """
+    One-adjustment scenarios from a "cut/increase X by N% (or $N)" question:
+    one, or one per reading when X names items in several columns and the
+    question doesn't say which. Empty if the message isn't one or X isn't a
+    category or known item.
+    """
+    m = WHAT_IF.search(message)
+    if m is None:
+        return []
+    target = m["target"].casefold()
+    words = set(re.findall(r"[a-z]+", target))
+    # A named department/team/service wins over a category word ("AI" in "AI team")
+    found = {}
+    for col in TARGET_COLUMNS:
+        names = [n for n in baseline.labels(col) if n and re.search(rf"\b{re.escape(n)}\b", target)]
+        if names:
+            found[col] = max(names, key=len)
+    if found:
+        readings = _readings(found, words, target)
+    else:
+        category = next((c for c, ws in CATEGORY_WORDS.items() if words & set(ws)), None)
+        if category is None:
+            return []
+        readings = [{"category": category}]
+
+    amount = float(m["amount"].replace(",", ""))
+    if m["verb"].lower() in DECREASE:
+        amount = -amount
+    name = m.group(0).strip()
+    scenarios = []
+    for targets in readings:
+        adjustment = {**targets, "kind": "percent" if m["unit"] else "absolute", "value": amount}
+        if m["start"]:
+            adjustment["start"] = m["start"]
+        label = name if len(readings) == 1 else f"{name} [{', '.join(f'{k} {v}' for k, v in targets.items())}]"
+        scenarios.append({"name": label, "adjustments": [adjustment]})
+    return scenarios
+
+
+def _readings(found: dict[str, str], words: set[str], target: str) -> list[dict]:
+    """Which of the matched columns a question means; several if it can't tell."""
+    # Keep the columns of the categories the question mentions (headcount words mean people)
+    mentioned = {c for c, ws in CATEGORY_WORDS.items() if words & set(ws)}
+    if words & HEADCOUNT_WORDS:
+        mentioned.add("people")
+    found = {col: v for col, v in found.items() if COLUMN_CATEGORIES[col] & mentioned} or found
+    # Then the column the question names ("engineering team's AI spend")
+    named = [col for col in found if re.search(rf"\b{col}s?\b", target)]
+    if len(found) > 1 and len(named) == 1:
+        found = {named[0]: found[named[0]]}
+    return [{col: value} for col, value in found.items()]
+
+
+def format_scenarios(result: dict) -> str:
+    """Scenario results as plain lines for the chat prompt."""
+    base = result["baseline"]
+    lines = [f"SCENARIO ENGINE (exact, {result['projected_from']} to {result['projected_to']}, "
+             f"baseline = average of the last {result['run_rate_months']} months)",
+             f"Baseline: ${base['monthly_total']:,.0f}/mo (${base['annualized']:,.0f}/yr)"]
+    for s in result["scenarios"]:
+        per_category = ", ".join(f"{CATEGORIES_BY_ID[c]} ${v:,.0f}/yr" for c, v in s["categories"].items())
+        lines.append(f"{s['name']}: ${s['monthly_total']:,.0f}/mo (${s['annualized']:,.0f}/yr, "
+                     f"{s['annual_change']:+,.0f}/yr vs baseline; {per_category})")
+    return "\n".join(lines)
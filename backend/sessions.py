@@ -0,0 +1,209 @@
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+from fastapi import HTTPException
+
+from agent import chat_prompt
+
+# --- Config ---
+CHAT_KEEP_TURNS = int(os.getenv("CHAT_KEEP_TURNS", "6"))          # messages sent verbatim
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "3000"))   # tokens for history per prompt
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+CHAT_SESSIONS_PER_USER = int(os.getenv("CHAT_SESSIONS_PER_USER", "20"))
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "3600"))   # seconds idle before a session expires
+DIGEST_CHARS = 200                                                # per folded message
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def digest(turn: dict) -> str:
+    """One-line stand-in for a message folded out of the verbatim window."""
+    role = "User" if turn.get("role") == "user" else "Assistant"
+    text = " ".join(str(turn.get("content", "")).split())
+    if len(text) > DIGEST_CHARS:
+        text = text[:DIGEST_CHARS].rstrip() + "…"
+    return f"- {role}: {text}"
+
+
+def clip(text: str, chars: int) -> str:
+    """text cut to at most `chars` characters, marked with an ellipsis if cut."""
+    if len(text) <= chars:
+        return text
+    return text[:max(0, chars - 1)] + "…"
+
+
+class ChatSession:
+    """
+    Server-side conversation. The last CHAT_KEEP_TURNS messages are sent
+    verbatim; older ones are folded into a rolling summary of one-line
+    digests, and the whole history section is kept under CHAT_TOKEN_BUDGET
+    (the last messages are cut short if they don't fit on their own).
+    """
+
+    def __init__(self, session_id: str, owner: str, history: list | None = None):
+        self.id = session_id
+        self.owner = owner
+        self.turns: list[dict] = [
+            {"role": h.get("role"), "content": h["content"]} for h in (history or [])
+        ]
+        self.summary_lines: list[str] = []
+        self.last_used = time.time()
+
+        # --- Metrics ---
+        self.requests = 0
+        self.folded_messages = 0
+        self.folded_tokens = 0      # tokens of the full text that was folded away
+        self.last_prompt_tokens = 0
+        self.max_prompt_tokens = 0
+        self.total_prompt_tokens = 0
+        self.total_full_history_tokens = 0
+
+    @property
+    def earlier(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    def _history_tokens(self) -> int:
+        return estimate_tokens(self.earlier) + sum(
+            estimate_tokens(t["content"]) for t in self.turns
+        )
+
+    def _fold_oldest(self):
+        turn = self.turns.pop(0)
+        self.summary_lines.append(digest(turn))
+        self.folded_messages += 1
+        self.folded_tokens += estimate_tokens(turn["content"])
+        # The rolling summary gets at most a quarter of the budget
+        while len(self.summary_lines) > 1 and estimate_tokens(self.earlier) > CHAT_TOKEN_BUDGET // 4:
+            self.summary_lines.pop(0)
+
+    def build_prompt(self, message: str, prefix: str) -> str:
+        while len(self.turns) > CHAT_KEEP_TURNS:
+            self._fold_oldest()
+        while len(self.turns) > 2 and self._history_tokens() > CHAT_TOKEN_BUDGET:
+            self._fold_oldest()
+
+        prompt = chat_prompt(message, self._fitted_turns(), prefix, self.earlier)
+
+        tokens = estimate_tokens(prompt)
+        self.requests += 1
+        self.last_used = time.time()
+        self.last_prompt_tokens = tokens
+        self.max_prompt_tokens = max(self.max_prompt_tokens, tokens)
+        self.total_prompt_tokens += tokens
+        # What replaying the whole conversation would have cost instead
+        self.total_full_history_tokens += tokens + self.folded_tokens - estimate_tokens(self.earlier)
+        return prompt
+
+    def _fitted_turns(self) -> list[dict]:
+        """
+        The verbatim turns, with the longest ones cut short if they alone
+        still exceed the budget; the stored turns keep their full text.
+        """
+        if self._history_tokens() <= CHAT_TOKEN_BUDGET:
+            return self.turns
+        # Characters left for the turns; estimate_tokens() adds one token per text
+        remaining = max(0, CHAT_TOKEN_BUDGET - estimate_tokens(self.earlier) - len(self.turns)) * 4
+        limits = {}
+        # Shorter turns are kept whole; what's left is shared by the longer ones
+        order = sorted(range(len(self.turns)), key=lambda i: len(self.turns[i]["content"]))
+        for n, i in enumerate(order):
+            limits[i] = min(len(self.turns[i]["content"]), remaining // (len(order) - n))
+            remaining -= limits[i]
+        return [{**t, "content": clip(t["content"], limits[i])} for i, t in enumerate(self.turns)]
+
+    def record(self, message: str, reply: str):
+        self.turns.append({"role": "user", "content": message})
+        self.turns.append({"role": "assistant", "content": reply})
+
+    def metrics(self) -> dict:
+        saved = self.total_full_history_tokens - self.total_prompt_tokens
+        return {
+            "session_id": self.id,
+            "requests": self.requests,
+            "verbatim_messages": len(self.turns),
+            "folded_messages": self.folded_messages,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "avg_prompt_tokens": round(self.total_prompt_tokens / self.requests, 1) if self.requests else 0,
+            "tokens_saved": max(0, saved),
+        }
+
+
+class SessionStore:
+    """
+    In-memory chat sessions. A session expires after CHAT_SESSION_TTL
+    seconds idle, each user keeps at most CHAT_SESSIONS_PER_USER (their
+    least recently used goes first), and past CHAT_MAX_SESSIONS overall the
+    least recently used session is evicted.
+    """
+
+    def __init__(self, max_sessions: int = CHAT_MAX_SESSIONS, per_owner: int = CHAT_SESSIONS_PER_USER,
+                 ttl: float = CHAT_SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.per_owner = per_owner
+        self.ttl = ttl
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()   # LRU order
+        self._by_owner: dict[str, OrderedDict[str, None]] = {}          # owner -> their session ids, LRU order
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, owner: str, session_id: str) -> ChatSession:
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is None or session.owner != owner:
+            raise HTTPException(status_code=404, detail="Chat session not found")
+        self._touch(session)
+        return session
+
+    def get_or_create(self, owner: str, session_id: str | None, history: list) -> ChatSession:
+        """Existing session by id, or a new one seeded with the client's history."""
+        if session_id:
+            return self.get(owner, session_id)
+        self._expire()
+        session = ChatSession(uuid.uuid4().hex, owner, history)
+        self._sessions[session.id] = session
+        owned = self._by_owner.setdefault(owner, OrderedDict())
+        owned[session.id] = None
+        # One user opening sessions in a loop only evicts their own
+        while len(owned) > self.per_owner:
+            self._drop(next(iter(owned)))
+            self.evicted += 1
+        while len(self._sessions) > self.max_sessions:
+            self._drop(next(iter(self._sessions)))
+            self.evicted += 1
+        return session
+
+    def _touch(self, session: ChatSession):
+        session.last_used = time.time()
+        self._sessions.move_to_end(session.id)
+        self._by_owner[session.owner].move_to_end(session.id)
+
+    def _expire(self):
+        """Drop sessions idle for longer than the TTL (the oldest are first in LRU order)."""
+        cutoff = time.time() - self.ttl
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used > cutoff:
+                break
+            self._drop(session.id)
+            self.expired += 1
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        owned = self._by_owner[session.owner]
+        del owned[session_id]
+        if not owned:
+            del self._by_owner[session.owner]
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "owners": len(self._by_owner),
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from demo_data import DATA_DIR, DEMO_FILES, load_ai_costs, load_payroll, load_saas
+from store import compact
+
+# On-disk layout of a frame snapshot: one .npy file per column plus
+# meta.json describing how to rebuild each column. Categoricals store their
+# integer codes (categories live in meta.json), Periods their int64 ordinals,
+# so every column is a plain fixed-width array that can be memory-mapped.
+META_FILE = "meta.json"
+# Optional drift totals (group_month_totals()) saved inside a dataset's snapshot
+TOTALS_DIR = "totals"
+
+# Snapshots of the demo CSVs, rebuilt whenever a CSV's hash changes
+DEMO_SNAPSHOT_DIR = os.getenv("DEMO_SNAPSHOT_DIR", str(DATA_DIR / "snapshots"))
+
+
+def save_frame(df: pd.DataFrame, directory: str, extra: dict | None = None,
+               totals: pd.DataFrame | None = None):
+    """
+    Write df as a columnar snapshot, with its drift `totals` if given (see
+    load_totals()). It is written to a new directory first and then swapped
+    in (any previous snapshot is renamed aside, then removed), so readers
+    never see a half-written snapshot or totals from another version.
+    Raises if the snapshot can't be written; the previous one is left in place.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        _write_columns(df, tmp, extra)
+        if totals is not None:
+            os.mkdir(os.path.join(tmp, TOTALS_DIR))
+            _write_columns(totals.reset_index(), os.path.join(tmp, TOTALS_DIR),
+                           {"index": list(totals.index.names)})
+        _swap_in(tmp, directory)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _write_columns(df: pd.DataFrame, directory: str, extra: dict | None):
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col]
+        if not isinstance(values.dtype, (pd.CategoricalDtype, pd.PeriodDtype, np.dtype)):
+            values = values.astype("category")  # strings and other extension types
+        elif values.dtype == object:
+            values = values.astype("category")
+
+        fname = f"{i}.npy"
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(directory, fname), values.cat.codes.to_numpy())
+            columns.append({"name": col, "kind": "category", "file": fname,
+                            "categories": values.cat.categories.tolist()})
+        elif isinstance(values.dtype, pd.PeriodDtype):
+            np.save(os.path.join(directory, fname), values.array.asi8)
+            columns.append({"name": col, "kind": "period", "file": fname,
+                            "dtype": str(values.dtype)})
+        else:
+            np.save(os.path.join(directory, fname), values.to_numpy())
+            columns.append({"name": col, "kind": "array", "file": fname})
+
+    meta = {"rows": len(df), "columns": columns, **(extra or {})}
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+
+def _swap_in(tmp: str, directory: str):
+    """Publish the finished snapshot in `tmp` as `directory`, restoring the old one on failure."""
+    aside = None
+    if os.path.exists(directory):
+        aside = tmp + ".old"    # tmp is unique, so this is too
+        os.rename(directory, aside)
+    try:
+        os.replace(tmp, directory)
+    except OSError:
+        if aside is not None and not os.path.exists(directory):
+            os.rename(aside, directory)
+        raise
+    if aside is not None:
+        shutil.rmtree(aside, ignore_errors=True)
+
+
+def read_meta(directory: str) -> dict | None:
+    try:
+        with open(os.path.join(directory, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def load_frame(directory: str, mmap: bool = False) -> pd.DataFrame:
+    """Read a snapshot written by save_frame(). With mmap=True numeric columns stay file-backed."""
+    meta = read_meta(directory)
+    if meta is None:
+        raise FileNotFoundError(f"No snapshot in {directory}")
+
+    data = {}
+    for c in meta["columns"]:
+        arr = np.load(os.path.join(directory, c["file"]), mmap_mode="r" if mmap else None)
+        if c["kind"] == "category":
+            data[c["name"]] = pd.Categorical.from_codes(np.asarray(arr), categories=c["categories"])
+        elif c["kind"] == "period":
+            data[c["name"]] = pd.arrays.PeriodArray(np.asarray(arr), dtype=pd.api.types.pandas_dtype(c["dtype"]))
+        else:
+            data[c["name"]] = arr
+    return pd.DataFrame(data, copy=False)
+
+
+def load_totals(directory: str) -> pd.DataFrame | None:
+    """The drift totals saved with a snapshot by save_frame(), or None if there are none."""
+    path = os.path.join(directory, TOTALS_DIR)
+    meta = read_meta(path)
+    if meta is None:
+        return None
+    return load_frame(path).set_index(meta["index"])
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_demo(mmap: bool = True) -> dict[str, pd.DataFrame]:
+    """
+    The demo datasets in compact form. Each CSV is parsed only when no
+    snapshot exists for its current hash; otherwise the snapshot is loaded
+    (memory-mapped by default), which skips read_csv and to_datetime. If
+    the snapshot can't be written (e.g. a read-only filesystem), the parsed
+    CSV is used as is.
+    """
+    loaders = {"payroll": load_payroll, "ai_costs": load_ai_costs, "saas_cloud": load_saas}
+    frames = {}
+    for name, loader in loaders.items():
+        digest = file_sha256(DATA_DIR / DEMO_FILES[name])
+        directory = os.path.join(DEMO_SNAPSHOT_DIR, name)
+        meta = read_meta(directory)
+        if meta is None or meta.get("source_sha256") != digest:
+            df = compact(loader(), name)
+            try:
+                save_frame(df, directory, extra={"source_sha256": digest})
+            except OSError as e:
+                # Another process may have published the same snapshot meanwhile
+                if (read_meta(directory) or {}).get("source_sha256") != digest:
+                    print(f"Could not snapshot demo {name} ({e}); using the parsed CSV")
+                    frames[name] = df
+                    continue
+        frames[name] = load_frame(directory, mmap=mmap)
+    return frames
@@ -0,0 +1,158 @@
+import pandas as pd
+
+from cache import next_version
+from drift import DRIFT_COLUMNS, add_totals, group_month_totals
+from ingest import SCHEMAS, categorize_text, compact_chunk, concat_chunks
+
+
+def compact(df: pd.DataFrame, dataset_type: str) -> pd.DataFrame:
+    """
+    Normalize a frame to the compact in-memory representation: categoricals
+    for dimension columns (and any other text column), downcast integers,
+    float32 seat counts where lossless and `month` as a monthly Period.
+    """
+    return categorize_text(compact_chunk(df.copy(), SCHEMAS.get(dataset_type, {})))
+
+
+def append_frames(old: pd.DataFrame, old_totals: pd.DataFrame | None,
+                  new: pd.DataFrame, dataset_type: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Merge newly uploaded rows (usually the latest month) into a stored
+    dataset. The drift totals are extended from the new rows only, so the
+    cost is O(new rows + groups) instead of a rescan of the full history.
+    Returns the combined frame and its updated totals. Raises ValueError if
+    the new rows repeat a month that is already stored, which would double
+    count it (replace the dataset instead).
+    """
+    new = compact(new, dataset_type)
+    if set(new.columns) != set(old.columns):
+        raise ValueError(f"Appended columns {list(new.columns)} don't match existing {list(old.columns)}")
+    new = new[list(old.columns)]
+    overlap = sorted(set(new["month"].unique()) & set(old["month"].unique()))
+    if overlap:
+        raise ValueError(f"{dataset_type} already has month(s) {', '.join(str(m) for m in overlap)}; "
+                         f"use mode=replace to reload them")
+
+    date_col, amount_col, group_cols = DRIFT_COLUMNS[dataset_type]
+    if old_totals is None:
+        old_totals = group_month_totals(old, date_col, amount_col, group_cols)
+    totals = add_totals(old_totals, group_month_totals(new, date_col, amount_col, group_cols))
+    return concat_chunks([old, new]), totals
+
+
+def combine_files(parts: list[tuple[str, pd.DataFrame]], dataset_type: str) -> pd.DataFrame:
+    """
+    One compact dataset from several parsed files (name, df) of the same
+    type, in month order. Raises ValueError if two files cover the same
+    month, which would double count it.
+    """
+    seen = {}
+    for name, df in parts:
+        for month in df["month"].unique():
+            if month in seen:
+                raise ValueError(f"{dataset_type} month {month} is in both {seen[month]} and {name}")
+            seen[month] = name
+    frames = [df for _, df in sorted(parts, key=lambda p: (p[1]["month"].min(), p[0]))]
+    return compact(concat_chunks(frames), dataset_type)
+
+
+class DatasetStore:
+    """
+    The loaded datasets ("payroll", "ai_costs", "saas_cloud"), kept in
+    compact form. Every write assigns the dataset a new version, which is
+    what derived-result caches key on.
+
+    A store can sit on top of a shared `base` store (the demo data): reads
+    fall through to the base for any dataset this store hasn't overridden,
+    so the base frames are shared rather than copied (copy-on-write).
+    """
+
+    def __init__(self, base: "DatasetStore | None" = None):
+        self.base = base
+        self._frames: dict[str, pd.DataFrame] = {}
+        self.versions: dict[str, int] = {}
+        # group_month_totals() per dataset, kept only once an append has built them
+        self.totals: dict[str, pd.DataFrame] = {}
+
+    def put(self, dataset_type: str, df: pd.DataFrame, totals: pd.DataFrame | None = None):
+        """Store an already-compact frame, optionally with its drift totals."""
+        self._frames[dataset_type] = df
+        if totals is None:
+            self.totals.pop(dataset_type, None)
+        else:
+            self.totals[dataset_type] = totals
+        self.versions[dataset_type] = next_version()
+
+    def put_many(self, frames: dict[str, tuple[pd.DataFrame, pd.DataFrame | None]]):
+        """
+        Store several compact frames (with optional totals) as one update.
+        The new dicts are swapped in whole, so a reader sees either all of
+        the old datasets or all of the new ones, never a mix.
+        """
+        new_frames, new_totals = dict(self._frames), dict(self.totals)
+        new_versions = dict(self.versions)
+        for dataset_type, (df, totals) in frames.items():
+            new_frames[dataset_type] = df
+            if totals is None:
+                new_totals.pop(dataset_type, None)
+            else:
+                new_totals[dataset_type] = totals
+            new_versions[dataset_type] = next_version()
+        self._frames, self.totals, self.versions = new_frames, new_totals, new_versions
+
+    def clear(self):
+        """Drop this store's own datasets, falling back to the base again."""
+        self._frames.clear()
+        self.versions.clear()
+        self.totals.clear()
+
+    def own_frames(self) -> dict[str, pd.DataFrame]:
+        """Datasets held by this store itself (not inherited from the base)."""
+        return dict(self._frames)
+
+    def __getitem__(self, dataset_type: str) -> pd.DataFrame:
+        if dataset_type in self._frames:
+            return self._frames[dataset_type]
+        if self.base is not None:
+            return self.base[dataset_type]
+        raise KeyError(dataset_type)
+
+    def __contains__(self, dataset_type: str) -> bool:
+        return dataset_type in self._frames or (self.base is not None and dataset_type in self.base)
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def keys(self) -> list[str]:
+        inherited = list(self.base.keys()) if self.base is not None else []
+        return inherited + [k for k in self._frames if k not in inherited]
+
+    def snapshot(self) -> dict[str, pd.DataFrame]:
+        """Plain dict of the current frames, safe to hand to a worker."""
+        return {k: self[k] for k in self.keys()}
+
+    def get_totals(self, dataset_type: str) -> pd.DataFrame | None:
+        if dataset_type in self._frames:
+            return self.totals.get(dataset_type)
+        if self.base is not None:
+            return self.base.get_totals(dataset_type)
+        return None
+
+    def totals_snapshot(self) -> dict[str, pd.DataFrame]:
+        totals = {k: self.get_totals(k) for k in self.keys()}
+        return {k: t for k, t in totals.items() if t is not None}
+
+    def all_versions(self) -> dict[str, int]:
+        inherited = self.base.all_versions() if self.base is not None else {}
+        return {**inherited, **self.versions}
+
+    def version_key(self) -> tuple:
+        """Hashable key identifying the current version of every dataset."""
+        return tuple(sorted(self.all_versions().items()))
+
+    def memory_usage(self) -> dict[str, int]:
+        """Bytes held by this store's own datasets, including categorical dictionaries."""
+        return {
+            name: int(df.memory_usage(deep=True).sum())
+            for name, df in self._frames.items()
+        }
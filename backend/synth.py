@@ -0,0 +1,164 @@
+"""
+Seeded synthetic datasets with the same columns as data/*.csv, for
+benchmarking at sizes the demo data can't reach. A share of the groups
+get a step increase over the last `drift_months` months, so the drift
+engine has something to find. The make_* functions return (df, drifted),
+where `drifted` lists those groups as the drift engine names them.
+
+    python synth.py ROWS [OUT_DIR]      # writes payroll/ai_costs/saas_cloud CSVs
+"""
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+FIRST_NAMES = ["Alex", "Betty", "Carlos", "Dana", "Elena", "Farid", "Grace", "Hiro",
+               "Ines", "Jamal", "Kira", "Liam", "Maya", "Nikhil", "Olga", "Priya"]
+LAST_NAMES = ["Nelson", "Garcia", "Kim", "Okafor", "Smith", "Rossi", "Chen", "Novak",
+              "Patel", "Silva", "Weber", "Haddad", "Ito", "Moreau", "Larsen", "Ortiz"]
+DEPARTMENTS = {
+    "Engineering": ["Backend Engineer", "Frontend Engineer", "SRE", "Data Engineer"],
+    "Sales": ["Account Executive", "Sales Engineer", "SDR"],
+    "Marketing": ["Growth Marketer", "Content Lead", "Designer"],
+    "Finance": ["Accountant", "FP&A Analyst"],
+    "Operations": ["Ops Manager", "Recruiter", "IT Support"],
+}
+BANDS = ["IC1", "IC2", "IC3", "IC4", "IC5", "M1", "M2"]
+BAND_SALARY = [5000, 6500, 8500, 11000, 14000, 12000, 16000]
+AI_MODELS = [  # (service, model, $ per 1M tokens)
+    ("OpenAI", "gpt-4-turbo", 30.0),
+    ("OpenAI", "gpt-4o", 15.0),
+    ("OpenAI", "text-embedding-ada-002", 0.1),
+    ("Anthropic", "claude-3-sonnet", 15.0),
+    ("Anthropic", "claude-3-haiku", 1.25),
+    ("Google", "gemini-1.5-pro", 10.0),
+]
+SAAS_CATEGORIES = ["Communication", "Productivity", "Engineering", "Design",
+                   "Cloud Infrastructure", "Security", "Analytics"]
+
+
+def _months(months: int, start: str) -> pd.DatetimeIndex:
+    return pd.date_range(start, periods=months, freq="MS")
+
+
+def _drift_factor(rng, groups: int, months: int, drift_share: float,
+                  drift_months: int) -> tuple[np.ndarray, np.ndarray]:
+    """(groups, months) multipliers: 1.0, or a 5-40% step up for drifted groups."""
+    drifted = rng.random(groups) < drift_share
+    step = 1 + rng.uniform(0.05, 0.40, groups) * drifted
+    factor = np.ones((groups, months))
+    factor[:, months - drift_months:] = step[:, None]
+    return factor, drifted
+
+
+def make_payroll(employees: int, months: int = 12, seed: int = 0,
+                 drift_share: float = 0.1, drift_months: int = 3,
+                 start: str = "2023-07") -> tuple[pd.DataFrame, list[str]]:
+    """One row per employee per month."""
+    rng = np.random.default_rng(seed)
+    dept_names = list(DEPARTMENTS)
+    dept = rng.integers(0, len(dept_names), employees)
+    role = [DEPARTMENTS[dept_names[d]][i % len(DEPARTMENTS[dept_names[d]])]
+            for i, d in enumerate(dept)]
+    band = rng.integers(0, len(BANDS), employees)
+    contractor = rng.random(employees) < 0.15
+    salary = (np.take(BAND_SALARY, band) * rng.uniform(0.85, 1.15, employees)).round()
+
+    factor, drifted = _drift_factor(rng, employees, months, drift_share, drift_months)
+    base = (salary[:, None] * factor).round().astype("int64").ravel()
+    overtime = rng.integers(0, 400, employees * months)
+
+    ids = np.array([f"EMP-{1001 + i}" for i in range(employees)], dtype=object)
+    names = np.array([f"{FIRST_NAMES[i % 16]} {LAST_NAMES[(i // 16) % 16]}"
+                      for i in range(employees)], dtype=object)
+    df = pd.DataFrame({
+        "employee_id": np.repeat(ids, months),
+        "name": np.repeat(names, months),
+        "department": np.repeat(np.take(dept_names, dept), months),
+        "role": np.repeat(np.array(role, dtype=object), months),
+        "band": np.repeat(np.take(BANDS, band), months),
+        "type": np.repeat(np.where(contractor, "Contractor", "FTE"), months),
+        "month": np.tile(_months(months, start), employees),
+        "base_salary": base,
+        "overtime": overtime,
+        "total": base + overtime,
+    })
+    return df, ids[drifted].tolist()
+
+
+def make_ai_costs(teams: int, months: int = 12, seed: int = 0,
+                  drift_share: float = 0.1, drift_months: int = 3,
+                  start: str = "2023-07") -> tuple[pd.DataFrame, list[str]]:
+    """One row per team x model per month; every team uses every model."""
+    rng = np.random.default_rng(seed)
+    pairs = teams * len(AI_MODELS)
+    team_names = np.array([f"Team {i:05d}" for i in range(teams)], dtype=object)
+    services, models, prices = (np.array(c, dtype=object) for c in zip(*AI_MODELS))
+
+    factor, drifted = _drift_factor(rng, pairs, months, drift_share, drift_months)
+    tokens = (rng.lognormal(15, 0.6, pairs)[:, None] * factor
+              * rng.uniform(0.9, 1.1, (pairs, months))).round().astype("int64").ravel()
+    price = np.repeat(np.tile(prices.astype("float64"), teams), months)
+
+    df = pd.DataFrame({
+        "team": np.repeat(team_names, len(AI_MODELS) * months),
+        "service": np.repeat(np.tile(services, teams), months),
+        "model": np.repeat(np.tile(models, teams), months),
+        "month": np.tile(_months(months, start), pairs),
+        "api_calls": (tokens / rng.uniform(1500, 4000, tokens.size)).round().astype("int64"),
+        "tokens_used": tokens,
+        "cost": (tokens * price / 1e6).round(2),
+    })
+    pair_team = np.repeat(team_names, len(AI_MODELS))[drifted]
+    pair_service = np.tile(services, teams)[drifted]
+    return df, [f"{t} - {s}" for t, s in zip(pair_team, pair_service)]
+
+
+def make_saas(services: int, months: int = 12, seed: int = 0,
+              drift_share: float = 0.1, drift_months: int = 3,
+              start: str = "2023-07") -> tuple[pd.DataFrame, list[str]]:
+    """One row per SaaS/cloud service per month."""
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Service {i:06d}" for i in range(services)], dtype=object)
+    category = np.take(SAAS_CATEGORIES, rng.integers(0, len(SAAS_CATEGORIES), services))
+    seats = rng.integers(5, 500, services).astype("float64")
+    seat_price = rng.uniform(3, 40, services)
+
+    factor, drifted = _drift_factor(rng, services, months, drift_share, drift_months)
+    total_seats = (seats[:, None] * factor).round().ravel()
+    active = (total_seats * rng.uniform(0.3, 1.0, total_seats.size)).round()
+
+    df = pd.DataFrame({
+        "service": np.repeat(names, months),
+        "category": np.repeat(category, months),
+        "month": np.tile(_months(months, start), services),
+        "total_seats": total_seats,
+        "active_seats": active,
+        "monthly_cost": (total_seats * np.repeat(seat_price, months)).round().astype("int64"),
+    })
+    return df, names[drifted].tolist()
+
+
+def make_datasets(rows: int, months: int = 12, seed: int = 0) -> dict[str, pd.DataFrame]:
+    """All three datasets with about `rows` rows each, shaped like load_all()."""
+    return {
+        "payroll": make_payroll(max(1, rows // months), months, seed)[0],
+        "ai_costs": make_ai_costs(max(1, math.ceil(rows / (months * len(AI_MODELS)))), months, seed)[0],
+        "saas_cloud": make_saas(max(1, rows // months), months, seed)[0],
+    }
+
+
+def write_csvs(datasets: dict[str, pd.DataFrame], directory: str):
+    """Write datasets as CSVs in the upload format (month as YYYY-MM)."""
+    os.makedirs(directory, exist_ok=True)
+    for name, df in datasets.items():
+        df.to_csv(os.path.join(directory, f"{name}.csv"), index=False, date_format="%Y-%m")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    out = sys.argv[2] if len(sys.argv) > 2 else f"synthetic_{n}"
+    write_csvs(make_datasets(n), out)
+    print(f"Wrote {n:,} rows per dataset to {out}/")
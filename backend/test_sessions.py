@@ -0,0 +1,56 @@
+"""
+Chat session limits: idle expiry, the per-user cap, and the history token
+budget holding even when a single message is larger than it.
+
+    python -m pytest test_sessions.py
+"""
+import pytest
+from fastapi import HTTPException
+
+import sessions
+from sessions import CHAT_TOKEN_BUDGET, ChatSession, SessionStore, estimate_tokens
+
+
+def test_one_user_only_evicts_their_own_sessions():
+    store = SessionStore(max_sessions=100, per_owner=3)
+    other = store.get_or_create("other@example.com", None, [])
+    mine = [store.get_or_create("me@example.com", None, []) for _ in range(10)]
+
+    assert store.get("other@example.com", other.id) is other
+    for session in mine[:-3]:
+        with pytest.raises(HTTPException):
+            store.get("me@example.com", session.id)
+    assert [store.get("me@example.com", s.id) for s in mine[-3:]] == mine[-3:]
+    assert store.stats()["sessions"] == 4
+
+
+def test_idle_sessions_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sessions.time, "time", lambda: now[0])
+    store = SessionStore(ttl=60)
+    idle = store.get_or_create("a@example.com", None, [])
+    active = store.get_or_create("b@example.com", None, [])
+
+    now[0] += 45
+    store.get("b@example.com", active.id)
+    now[0] += 30
+    with pytest.raises(HTTPException):
+        store.get("a@example.com", idle.id)
+    assert store.get("b@example.com", active.id) is active
+    assert store.stats()["expired"] == 1
+
+
+def test_huge_turns_are_cut_to_the_budget():
+    huge = "x" * (CHAT_TOKEN_BUDGET * 4 * 3)
+    session = ChatSession("s", "a@example.com", [
+        {"role": "user", "content": "short question"},
+        {"role": "assistant", "content": huge},
+    ])
+    turns = session._fitted_turns()
+
+    assert sum(estimate_tokens(t["content"]) for t in turns) <= CHAT_TOKEN_BUDGET
+    assert turns[0]["content"] == "short question"
+    assert turns[1]["content"].endswith("…")
+    # The stored history keeps the full text
+    assert session.turns[1]["content"] == huge
+    assert estimate_tokens(session.build_prompt("next?", "PREFIX")) < CHAT_TOKEN_BUDGET + 100
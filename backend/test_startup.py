@@ -0,0 +1,21 @@
+"""
+Cold-start budget: a fresh uvicorn process must answer its first GET
+/health within STARTUP_BUDGET_S (median of a few runs). See
+bench_startup.py for the import-time breakdown when this fails.
+
+    python -m pytest test_startup.py
+"""
+import statistics
+
+from bench_startup import STARTUP_BUDGET_S, time_to_health
+
+RUNS = 3
+
+
+def test_first_health_within_budget():
+    runs = [time_to_health() for _ in range(RUNS)]
+    median = statistics.median(runs)
+    assert median <= STARTUP_BUDGET_S, (
+        f"median time to first /health {median:.3f}s is over the {STARTUP_BUDGET_S:.3f}s budget "
+        f"(runs: {', '.join(f'{s:.3f}s' for s in runs)})"
+    )
@@ -0,0 +1,74 @@
+"""
+Property checks for incremental appends: however a dataset is split into
+month ranges and appended, the drift result computed from the running
+totals must match a full recompute over the concatenated frame.
+
+    python -m pytest test_store.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from drift import analyze_all
+from snapshot import load_totals, save_frame
+from store import append_frames, compact
+from synth import make_datasets
+
+SEEDS = range(8)
+
+
+@pytest.fixture(scope="module")
+def datasets():
+    return {name: compact(df, name) for name, df in make_datasets(3_000, months=12, seed=1).items()}
+
+
+def random_split(df: pd.DataFrame, rng) -> list[pd.DataFrame]:
+    """df cut into 2-5 consecutive, non-overlapping month ranges."""
+    months = np.sort(df["month"].unique())
+    cuts = np.sort(rng.choice(np.arange(1, len(months)), size=rng.integers(1, 5), replace=False))
+    return [df[df["month"].isin(part)] for part in np.split(months, cuts)]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_appended_totals_match_full_recompute(datasets, seed):
+    rng = np.random.default_rng(seed)
+    merged, totals = {}, {}
+    for name, df in datasets.items():
+        first, *rest = random_split(df, rng)
+        frame, frame_totals = first, None
+        for part in rest:
+            frame, frame_totals = append_frames(frame, frame_totals, part, name)
+        merged[name], totals[name] = frame, frame_totals
+
+    # The parts concatenated back are the original frames
+    assert _close(analyze_all(merged, totals=totals), analyze_all(datasets))
+
+
+def _close(a, b):
+    """Recursive equality with float tolerance for analyze_all() results."""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_close(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_close(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) and isinstance(b, float):
+        return a == pytest.approx(b, rel=1e-9, abs=1e-6)
+    return a == b
+
+
+def test_append_rejects_overlapping_months(datasets):
+    df = datasets["ai_costs"]
+    latest = df["month"].max()
+    old, new = df, df[df["month"] == latest]
+    with pytest.raises(ValueError, match="already has month"):
+        append_frames(old, None, new, "ai_costs")
+
+
+def test_totals_survive_a_snapshot_round_trip(datasets, tmp_path):
+    df = datasets["ai_costs"]
+    first, *rest = random_split(df, np.random.default_rng(0))
+    frame, totals = append_frames(first, None, pd.concat(rest), "ai_costs")
+    save_frame(frame, str(tmp_path / "ai_costs"), totals=totals)
+
+    loaded = load_totals(str(tmp_path / "ai_costs"))
+    pd.testing.assert_frame_equal(loaded, totals, check_dtype=False, check_index_type=False)
+    assert load_totals(str(tmp_path / "missing")) is None
@@ -0,0 +1,155 @@
+"""
+SSE streaming with a stub model runner: event framing of /api/chat/stream
+and /api/analyze/stream, and that the upstream stream is closed when the
+client goes away.
+
+    python -m pytest test_streaming.py
+"""
+import asyncio
+import json
+import os
+import tempfile
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+# Throwaway user database and workspaces; no background warm-up
+_scratch = tempfile.TemporaryDirectory(prefix="paydrift-test-")
+os.environ["DB_PATH"] = os.path.join(_scratch.name, "paydrift.db")
+os.environ["WORKSPACE_DIR"] = os.path.join(_scratch.name, "workspaces")
+os.environ["WARMUP"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import agent  # noqa: E402
+import main  # noqa: E402
+
+
+class StubStream:
+    """Async iterator of chat-completion chunks; with `block`, hangs after the last one."""
+
+    def __init__(self, parts, block=False):
+        self.parts = list(parts)
+        self.block = block
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.parts:
+            if self.block:
+                await asyncio.Event().wait()
+            raise StopAsyncIteration
+        delta = SimpleNamespace(content=self.parts.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    async def aclose(self):
+        self.closed = True
+
+
+class StubRunner:
+    def __init__(self, parts=("Hello", " world"), block=False):
+        self.parts, self.block = parts, block
+        self.streams = []
+
+    def run(self, input, model, stream=False):
+        if stream:
+            self.streams.append(StubStream(self.parts, self.block))
+            return self.streams[-1]
+
+        async def response():
+            return SimpleNamespace(final_output=f"answer to a {len(input)}-character prompt")
+        return response()
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    stub = StubRunner()
+    monkeypatch.setattr(agent, "get_runner", lambda: stub)
+    return stub
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        email = f"test-{uuid.uuid4().hex}@example.com"
+        r = client.post("/api/register", json={"email": email, "name": "Test", "password": "test"})
+        client.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+        yield client
+
+
+def parse_events(body: str) -> list[tuple[str, dict]]:
+    """(event name, data) per SSE event; every event must end with a blank line."""
+    assert body.endswith("\n\n")
+    events = []
+    for block in body[:-2].split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        assert set(fields) <= {"event", "data"}
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+def test_chat_stream_framing(client, runner):
+    r = client.post("/api/chat/stream", json={"message": "What drifted most?"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.headers["X-Session-Id"]
+    assert parse_events(r.text) == [
+        ("message", {"delta": "Hello"}),
+        ("message", {"delta": " world"}),
+        ("done", {}),
+    ]
+    assert runner.streams[0].closed
+
+
+def test_analyze_stream_matches_analyze(client, runner):
+    r = client.post("/api/analyze/stream")
+    assert r.status_code == 200
+    events = parse_events(r.text)
+    assert events[-1] == ("done", {})
+    streamed = "".join(data["delta"] for _, data in events[:-1])
+    # Heading, one section per category, recommendations
+    assert len(events) - 1 == 2 + len(client.get("/api/drift").json()["categories"])
+    assert streamed == client.post("/api/analyze").json()["analysis"]
+
+
+def test_stream_error_event(client, monkeypatch):
+    class Failing(StubRunner):
+        def run(self, input, model, stream=False):
+            raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(agent, "get_runner", lambda: Failing())
+    r = client.post("/api/chat/stream", json={"message": "hi"})
+    assert parse_events(r.text) == [("error", {"detail": "upstream down"})]
+
+
+def test_disconnect_closes_upstream(runner):
+    async def scenario():
+        events = main.sse_response(agent.stream_tokens("prompt")).body_iterator
+        assert await events.__anext__() == 'data: {"delta": "Hello"}\n\n'
+        # What the server does with the response body when the client goes away
+        await events.aclose()
+        # Closed right away, not when the event loop finalizes leftover generators
+        assert runner.streams[0].closed
+
+    asyncio.run(scenario())
+
+
+def test_cancel_while_waiting_closes_upstream(monkeypatch):
+    stub = StubRunner(parts=["Hello"], block=True)
+    monkeypatch.setattr(agent, "get_runner", lambda: stub)
+
+    async def scenario():
+        events = main.sse_response(agent.stream_tokens("prompt")).body_iterator
+        await events.__anext__()
+        # Cancelled while waiting on the model for the next token
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.01)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        assert stub.streams[0].closed
+
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+"""
+WorkerPool admission: a job whose caller is cancelled still occupies its
+worker, so it counts as pending until it actually finishes.
+
+    python -m pytest test_workers.py
+"""
+import asyncio
+import threading
+
+from workers import WorkerPool
+
+
+def test_cancelled_caller_keeps_job_pending_until_it_finishes():
+    pool = WorkerPool("thread", workers=1, queue_limit=4)
+    release = threading.Event()
+
+    async def scenario():
+        caller = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        await asyncio.sleep(0.05)
+        # The request is gone but the worker is still busy with its job
+        assert caller.cancelled()
+        assert pool.pending == 1
+
+        release.set()
+        for _ in range(100):
+            if pool.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.pending == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_pending_counts_finished_jobs():
+    pool = WorkerPool("thread", workers=2, queue_limit=4)
+
+    async def scenario():
+        results = await asyncio.gather(*(pool.run(sum, [i, 1]) for i in range(5)))
+        await asyncio.sleep(0)
+        return results
+
+    try:
+        assert asyncio.run(scenario()) == [1, 2, 3, 4, 5]
+        assert pool.pending == 0 and pool.completed == 5
+    finally:
+        pool.shutdown()
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+from drift import round2, to_records
+from metrics import span
+
+# --- Thresholds ---
+UNDERUSED = 0.3          # a month counts as under-utilized below 30% of seats active
+SUSTAINED_MONTHS = 3     # an under-utilized streak this long is "sustained"
+
+SORTS = ["idle_cost", "idle_cost_total", "current_streak", "utilization"]
+
+
+def service_matrix(values: np.ndarray, cell: np.ndarray, shape) -> np.ndarray:
+    """service x month sums of values (NaN rows skipped); several line items per month add up."""
+    values = np.asarray(values, dtype="float64")
+    keep = ~np.isnan(values)
+    return np.bincount(cell[keep], values[keep], minlength=shape[0] * shape[1]).reshape(shape)
+
+
+def streaks(flags: np.ndarray, observed: np.ndarray) -> np.ndarray:
+    """
+    Length of the run of True ending at each month, for every row at once,
+    counted in observed months: an unobserved month neither breaks a run
+    nor extends it (its value carries over from the month before).
+    """
+    seen = np.cumsum(observed, axis=1)
+    last_break = np.maximum.accumulate(np.where(observed & ~flags, seen, 0), axis=1)
+    return seen - last_break
+
+
+@span("utilization.service_utilization")
+def service_utilization(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per seat-based SaaS service over its whole history, computed on
+    service x month matrices in one pass (no per-service loop):
+
+      utilization       active / total seats in the service's latest month
+      avg_utilization   active / total seats summed over all months
+      idle_cost         monthly_cost x (1 - active / total) in the latest month
+      idle_cost_total   the same summed over every month
+      current_streak    consecutive months under UNDERUSED, up to the latest
+      longest_streak    longest such run in the history
+
+    Months without seat counts (usage-billed services, gaps in the data)
+    are skipped: they don't break a streak and don't count toward it.
+    Services that never have seat counts are left out.
+    """
+    services = df["service"].astype("category")
+    codes = services.cat.codes.to_numpy().astype(np.int64)
+    months = df["month"]
+    if not isinstance(months.dtype, pd.PeriodDtype):
+        months = pd.to_datetime(months).dt.to_period("M")
+    ordinals = months.array.asi8
+    first = ordinals.min()
+    month_idx = ordinals - first
+    n_services, n_months = len(services.cat.categories), int(month_idx.max()) + 1
+    shape = (n_services, n_months)
+    cell = codes * n_months + month_idx
+
+    # A row has seat data only if both counts are present
+    total_col = df["total_seats"].to_numpy(dtype="float64")
+    active_col = df["active_seats"].to_numpy(dtype="float64")
+    seated = ~(np.isnan(total_col) | np.isnan(active_col))
+    total = service_matrix(np.where(seated, total_col, np.nan), cell, shape)
+    active = service_matrix(np.where(seated, active_col, np.nan), cell, shape)
+    cost = service_matrix(np.where(seated, df["monthly_cost"].to_numpy(dtype="float64"), np.nan), cell, shape)
+
+    observed = total > 0
+    keep = observed.any(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        util = np.where(observed, active / total, np.nan)
+    idle = np.where(observed, cost * np.clip(1 - util, 0, 1), 0.0)
+    under = observed & (util < UNDERUSED)
+    runs = streaks(under, observed)
+
+    # Latest month with seat data per service
+    last_idx = n_months - 1 - np.argmax(observed[:, ::-1], axis=1)
+    rows = np.arange(n_services)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_util = active.sum(axis=1) / total.sum(axis=1)
+
+    # Category of each service's last row: the last one (in file order) of its latest month
+    n_rows = len(df)
+    latest_key = np.full(n_services, -1, dtype=np.int64)
+    np.maximum.at(latest_key, codes, month_idx * n_rows + np.arange(n_rows))
+    last_row = latest_key % n_rows
+    category = (df["category"].astype(str).to_numpy(dtype=object)[last_row]
+                if "category" in df.columns else np.full(n_services, "", dtype=object))
+
+    month_labels = pd.PeriodIndex.from_ordinals(np.arange(first, first + n_months), freq="M")
+    result = pd.DataFrame({
+        "service": services.cat.categories.astype(str),
+        "category": category,
+        "latest_month": month_labels[last_idx].strftime("%Y-%m"),
+        "total_seats": total[rows, last_idx],
+        "active_seats": active[rows, last_idx],
+        "monthly_cost": cost[rows, last_idx],
+        "utilization": util[rows, last_idx],
+        "avg_utilization": avg_util,
+        "idle_cost": idle[rows, last_idx],
+        "idle_cost_total": idle.sum(axis=1),
+        "current_streak": runs[rows, last_idx],
+        "longest_streak": runs.max(axis=1),
+        "months": observed.sum(axis=1),
+    })
+    return result[keep].reset_index(drop=True)
+
+
+def rank_services(table: pd.DataFrame, sort: str = "idle_cost", top_k: int = 50, offset: int = 0) -> dict:
+    """
+    Services ranked by `sort` (one of SORTS; lowest utilization first for
+    "utilization", largest first otherwise), items[offset:offset + top_k],
+    with totals over every service.
+    """
+    values = table[sort].to_numpy(dtype="float64")
+    order = np.argsort(values if sort == "utilization" else -values, kind="stable")
+    rows = table.iloc[order[offset:offset + top_k]]
+
+    flagged = (table["utilization"] < UNDERUSED).to_numpy()
+    sustained = (table["current_streak"] >= SUSTAINED_MONTHS).to_numpy()
+    idle_monthly = float(table["idle_cost"].sum())
+    items = to_records({
+        "service": rows["service"].to_numpy(dtype=object),
+        "category": rows["category"].to_numpy(dtype=object),
+        "latest_month": rows["latest_month"].to_numpy(dtype=object),
+        "total_seats": round2(rows["total_seats"]),
+        "active_seats": round2(rows["active_seats"]),
+        "monthly_cost": round2(rows["monthly_cost"]),
+        "utilization_pct": round2(rows["utilization"] * 100),
+        "avg_utilization_pct": round2(rows["avg_utilization"] * 100),
+        "idle_cost": round2(rows["idle_cost"]),
+        "idle_cost_annualized": round2(rows["idle_cost"] * 12),
+        "idle_cost_total": round2(rows["idle_cost_total"]),
+        "current_streak": rows["current_streak"].to_numpy(),
+        "longest_streak": rows["longest_streak"].to_numpy(),
+        "months": rows["months"].to_numpy(),
+        "flagged": flagged[order[offset:offset + top_k]],
+        "sustained": sustained[order[offset:offset + top_k]],
+    })
+    return {
+        "sort": sort,
+        "threshold_pct": UNDERUSED * 100,
+        "services": len(table),
+        "flagged": int(flagged.sum()),
+        "sustained": int(sustained.sum()),
+        "idle_cost_monthly": round(idle_monthly, 2),
+        "idle_cost_annualized": round(idle_monthly * 12, 2),
+        "items": items,
+    }
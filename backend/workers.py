@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+# --- Config ---
+WORKER_MODE = os.getenv("WORKER_MODE", "thread")  # "thread" | "process"
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", str(min(4, os.cpu_count() or 1))))
+WORKER_QUEUE_LIMIT = int(os.getenv("WORKER_QUEUE_LIMIT", "16"))  # waiting jobs beyond busy workers
+# Bulk file parsing is GIL-bound (read_csv, to_datetime), so it gets its own process pool
+PARSE_WORKER_COUNT = int(os.getenv("PARSE_WORKER_COUNT", str(os.cpu_count() or 1)))
+
+
+def _timed_call(fn, args):
+    """Runs inside the worker; reports when the job actually started."""
+    return time.time(), fn(*args)
+
+
+class WorkerPool:
+    """
+    Executor for CPU-bound pandas work (drift computation, file parsing) so
+    it never runs on the event loop. Admission is bounded: once every worker
+    is busy and `queue_limit` jobs are waiting, new jobs get a 429.
+    In process mode, `fn` and its arguments must be picklable.
+    """
+
+    def __init__(self, mode: str = WORKER_MODE, workers: int = WORKER_COUNT,
+                 queue_limit: int = WORKER_QUEUE_LIMIT):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"WORKER_MODE must be 'thread' or 'process', got {mode!r}")
+        self.mode = mode
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = None
+
+        # --- Metrics ---
+        self.pending = 0            # queued + running
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            cls = ProcessPoolExecutor if self.mode == "process" else ThreadPoolExecutor
+            self._executor = cls(max_workers=self.workers)
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.pending - self.workers)
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool and await the result."""
+        if self.queue_depth >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        loop = asyncio.get_running_loop()
+        job = self.executor.submit(_timed_call, fn, args)
+        self.pending += 1
+        self.submitted += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        submitted_at = time.time()
+        # A job keeps its worker after the awaiting request is cancelled, so
+        # it stays pending until it actually finishes (or is dropped unstarted)
+        job.add_done_callback(lambda _: loop.call_soon_threadsafe(self._job_done))
+        started_at, result = await asyncio.wrap_future(job)
+
+        wait = max(0.0, started_at - submitted_at)
+        self.completed += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return result
+
+    def _job_done(self):
+        self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self.pending,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.completed * 1000, 2) if self.completed else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+        }
+
+
+pool = WorkerPool()
+parse_pool = WorkerPool("process", PARSE_WORKER_COUNT, WORKER_QUEUE_LIMIT)
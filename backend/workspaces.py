@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from fastapi.concurrency import run_in_threadpool
+
+from cache import next_version
+from snapshot import load_demo, load_frame, load_totals, read_meta, save_frame
+from store import DatasetStore
+
+# --- Config ---
+WORKSPACE_MEMORY_MB = float(os.getenv("WORKSPACE_MEMORY_MB", "512"))
+WORKSPACE_DIR = os.getenv(
+    "WORKSPACE_DIR", os.path.join(os.path.dirname(__file__), "workspaces")
+)
+
+
+class WorkspaceManager:
+    """
+    One DatasetStore per user (JWT subject), layered over the shared demo
+    store so untouched datasets aren't duplicated.
+
+    Uploads are written through to columnar snapshots under `data_dir`, so
+    workspaces survive restarts and redeploys. When uploaded data across all
+    workspaces exceeds the memory budget, the least recently used ones are
+    dropped from memory and reloaded from their snapshot on next access.
+    """
+
+    def __init__(self, budget_bytes: int, data_dir: str):
+        self.budget_bytes = budget_bytes
+        self.data_dir = data_dir
+        self.demo = DatasetStore()
+        self.demo_loaded = False        # demo data loads on first use, see ensure_demo()
+        self._demo_lock = asyncio.Lock()
+        self._loaded: OrderedDict[str, DatasetStore] = OrderedDict()  # LRU order
+        self._on_disk: dict[str, dict[str, int]] = {}                  # owner -> versions in snapshots
+        self._pins: dict[str, int] = {}                                # owners mid-request
+        self._disk_locks: dict[str, asyncio.Lock] = {}                 # one snapshot write/delete per owner at a time
+        self._append_locks: dict[str, asyncio.Lock] = {}               # one read-merge-write append per owner at a time
+        self.spills = 0
+        self.reloads = 0
+
+    def _path(self, owner: str) -> str:
+        return os.path.join(self.data_dir, hashlib.sha256(owner.encode()).hexdigest()[:32])
+
+    def load_index(self):
+        """Register workspaces snapshotted by a previous process; their data loads lazily."""
+        if not os.path.isdir(self.data_dir):
+            return
+        for entry in os.listdir(self.data_dir):
+            path = os.path.join(self.data_dir, entry)
+            if entry.startswith(".") or not os.path.isdir(path):
+                continue
+            for name in os.listdir(path):
+                meta = read_meta(os.path.join(path, name))
+                if meta is not None and "owner" in meta:
+                    self._on_disk.setdefault(meta["owner"], {})[name] = next_version()
+
+    async def ensure_demo(self):
+        """
+        Load the demo datasets (from their snapshots) if they aren't yet.
+        Called on first use and by the startup warm-up, so the server can
+        answer /health before any data is read. Datasets already put() in
+        the demo store are kept.
+        """
+        if self.demo_loaded:
+            return
+        async with self._demo_lock:
+            if self.demo_loaded:
+                return
+            for name, df in (await run_in_threadpool(load_demo)).items():
+                if name not in self.demo:
+                    # Columnar snapshots; already compact, so put() as-is
+                    self.demo.put(name, df)
+            self.demo_loaded = True
+
+    async def get(self, owner: str) -> DatasetStore:
+        """The owner's workspace, reloading it from disk if it isn't in memory."""
+        await self.ensure_demo()
+        store = self._loaded.get(owner)
+        if store is not None:
+            self._loaded.move_to_end(owner)
+            return store
+
+        store = DatasetStore(base=self.demo)
+        versions = dict(self._on_disk.get(owner, {}))
+        if versions:
+            frames = await run_in_threadpool(self._read, owner, list(versions))
+            for name, (df, totals) in frames.items():
+                store.put(name, df, totals)
+            # Same data as in the snapshot, so keep its versions (and cached results)
+            store.versions.update(versions)
+            self.reloads += 1
+        # Another request may have loaded it while we were reading
+        store = self._loaded.setdefault(owner, store)
+        self._loaded.move_to_end(owner)
+        if versions:
+            await self.enforce_budget()
+        return store
+
+    @asynccontextmanager
+    async def pinned(self, owner: str):
+        """Hold the owner's workspace in memory for a write, then persist it."""
+        self._pins[owner] = self._pins.get(owner, 0) + 1
+        try:
+            store = await self.get(owner)
+            yield store
+            await self._persist(owner, store)
+        finally:
+            self._pins[owner] -= 1
+            if not self._pins[owner]:
+                del self._pins[owner]
+        await self.enforce_budget()
+
+    async def reset(self, owner: str):
+        """
+        Back to demo data: drop the owner's uploads in memory and on disk.
+        Waits for a snapshot write already in progress, so it can't land
+        after the delete and bring the uploads back on the next reload.
+        """
+        store = self._loaded.get(owner)
+        if store is not None:
+            store.clear()
+        async with self._disk_lock(owner):
+            if self._on_disk.pop(owner, None) is not None:
+                await run_in_threadpool(shutil.rmtree, self._path(owner), True)
+
+    def _disk_lock(self, owner: str) -> asyncio.Lock:
+        return self._disk_locks.setdefault(owner, asyncio.Lock())
+
+    def append_lock(self, owner: str) -> asyncio.Lock:
+        """Serializes one owner's appends (read, merge, write); other owners don't wait."""
+        return self._append_locks.setdefault(owner, asyncio.Lock())
+
+    def memory_bytes(self) -> int:
+        return sum(sum(s.memory_usage().values()) for s in self._loaded.values())
+
+    async def enforce_budget(self):
+        """Drop least recently used workspaces from memory until uploads fit the budget."""
+        while self.memory_bytes() > self.budget_bytes:
+            victim = next(
+                (o for o, s in self._loaded.items()
+                 if s.own_frames() and o not in self._pins),
+                None,
+            )
+            # Never spill the most recently used workspace
+            if victim is None or victim == next(reversed(self._loaded)):
+                return
+            if not await self._spill(victim):
+                return
+
+    async def _persist(self, owner: str, store: DatasetStore):
+        """
+        Write the datasets whose version differs from what's on disk. If a
+        write fails, the data stays in memory only (and won't be spilled);
+        the next persist of this workspace tries again.
+        """
+        # Decided under the lock, so a write queued behind a reset sees the cleared store
+        async with self._disk_lock(owner):
+            on_disk = self._on_disk.get(owner, {})
+            changed = {
+                name: (df, store.totals.get(name)) for name, df in store.own_frames().items()
+                if on_disk.get(name) != store.versions[name]
+            }
+            if not changed:
+                return
+            versions = {name: store.versions[name] for name in changed}
+            try:
+                await run_in_threadpool(self._write, owner, changed)
+            except Exception as e:
+                # Disk errors, but also a column the snapshot can't encode
+                print(f"Could not snapshot workspace datasets {list(changed)}: {e!r}")
+                return
+            self._on_disk.setdefault(owner, {}).update(versions)
+
+    async def _spill(self, owner: str) -> bool:
+        store = self._loaded[owner]
+        await self._persist(owner, store)
+
+        # Only drop it if nothing changed or touched it while we were writing
+        if (self._loaded.get(owner) is store and owner not in self._pins
+                and self._on_disk.get(owner) == store.versions):
+            del self._loaded[owner]
+            self.spills += 1
+            return True
+        return False
+
+    def _write(self, owner: str, frames: dict):
+        """Snapshot each (df, totals); the totals let the next append skip a full rescan."""
+        path = self._path(owner)
+        for name, (df, totals) in frames.items():
+            save_frame(df, os.path.join(path, name), extra={"owner": owner}, totals=totals)
+
+    def _read(self, owner: str, names: list[str]) -> dict:
+        path = self._path(owner)
+        return {
+            name: (load_frame(os.path.join(path, name)), load_totals(os.path.join(path, name)))
+            for name in names
+        }
+
+    def stats(self) -> dict:
+        return {
+            "loaded": len(self._loaded),
+            "on_disk_only": len(set(self._on_disk) - set(self._loaded)),
+            "memory_bytes": self.memory_bytes(),
+            "budget_bytes": self.budget_bytes,
+            "demo_memory_bytes": self.demo.memory_usage(),
+            "spills": self.spills,
+            "reloads": self.reloads,
+        }
+
+
+workspaces = WorkspaceManager(int(WORKSPACE_MEMORY_MB * 1024 * 1024), WORKSPACE_DIR)